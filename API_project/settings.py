@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +47,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its render timing hook runs last (see LittleLemonAPI/metrics.py)
+    'LittleLemonAPI.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,6 +89,54 @@ DATABASES = {
     }
 }
 
+# LITTLELEMON_DB_PROFILE=production tunes SQLite for concurrent use: WAL
+# journaling so readers and the writer do not block each other, a busy
+# timeout instead of immediate "database is locked" errors, transactions that
+# take the write lock when they begin (LittleLemonAPI/backends/sqlite3),
+# persistent connections and a read-only connection for the read-only views.
+# PRAGMAS are applied to every new connection (see LittleLemonAPI/signals.py).
+DATABASE_PROFILE = os.environ.get('LITTLELEMON_DB_PROFILE', 'development')
+
+if DATABASE_PROFILE == 'production':
+    DATABASES['default'].update({
+        'ENGINE': 'LittleLemonAPI.backends.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'timeout': 20},
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 20000,
+        },
+    })
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{BASE_DIR / 'db.sqlite3'}?mode=ro",
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'timeout': 20},
+        'PRAGMAS': {
+            'busy_timeout': 20000,
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['LittleLemonAPI.routers.ReadReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/ref/settings/#caches
+
+# Catalog and cart version counters, token revocations and role sets have to
+# agree across every worker process, so Django's cache lives in files shared
+# by the whole host rather than in each process's memory.
+CACHES = {
+    'default': {
+        'BACKEND': 'LittleLemonAPI.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('LITTLELEMON_CACHE_DIR', BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -128,11 +180,100 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
+    # FastJSONRenderer uses orjson when installed; MessagePack is offered to
+    # clients that ask for it when msgpack is installed (see below)
+    'DEFAULT_RENDERER_CLASSES': [
+        'LittleLemonAPI.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'LittleLemonAPI.authentication.CachedTokenAuthentication',
+    ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'LittleLemonAPI.throttling.AnonTokenBucketThrottle',
+        'LittleLemonAPI.throttling.UserTokenBucketThrottle',
     ),
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '60/minute',
+        'user': '300/minute',
+    },
 }
 
+if importlib.util.find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('LittleLemonAPI.renderers.MessagePackRenderer')
+
 DJOSER = {
     'USER_ID_FIELD': 'username'
 }
+
+# Maximum number of menu responses kept by the in-process catalog cache
+CATALOG_CACHE_MAX_ENTRIES = 512
+
+# Stock changes from carts and checkouts reach cached menu responses (and
+# their ETags) at most this many seconds late
+CATALOG_STOCK_DEBOUNCE = 1
+
+# Cursor pagination for /api/menu-items/ (clients may ask for up to the max
+# with ?page_size=)
+MENU_ITEMS_PAGE_SIZE = 50
+MENU_ITEMS_MAX_PAGE_SIZE = 200
+
+# Keyset pagination for /api/orders/, newest first
+ORDERS_PAGE_SIZE = 50
+ORDERS_MAX_PAGE_SIZE = 200
+
+# Largest batch accepted by /api/menu-items/import/
+MENU_IMPORT_MAX_ROWS = 5000
+
+# Menu, cart and order responses smaller than this are sent uncompressed
+# (gzip, or Brotli when the brotli package is installed)
+RESPONSE_COMPRESSION_MIN_BYTES = 1024
+
+# How long dishes added to a cart stay reserved out of the inventory; run
+# `manage.py release_expired_reservations` periodically to give back the
+# stock of abandoned carts
+CART_RESERVATION_SECONDS = 15 * 60
+
+# Resolved API tokens are cached per process to skip the token/user join
+TOKEN_CACHE_MAX_ENTRIES = 10000
+TOKEN_CACHE_TTL = 300
+
+# Token buckets for the throttles live in this file so every worker process
+# on the host shares them
+THROTTLE_STORE_PATH = BASE_DIR / 'throttle.sqlite3'
+
+# Seconds a request waits for the token bucket store's write lock before it
+# is refused with a 429
+THROTTLE_STORE_TIMEOUT = 0.1
+
+# How often each process reloads the delivery crew load table from the
+# database to pick up changes made by other workers
+DISPATCHER_REFRESH_SECONDS = 60
+
+# Upper bounds (seconds) of the request latency histogram served by
+# /api/metrics/
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Background jobs (LittleLemonAPI/jobs.py). Each web process starts a pool
+# of JOB_WORKERS threads ('thread') or processes ('process') on the first
+# enqueue; set JOB_QUEUE_AUTOSTART = False when running
+# `manage.py run_job_workers` separately. Enqueueing fails with 503 once
+# JOB_QUEUE_MAX_PENDING jobs are waiting, and jobs hitting a locked
+# database are retried with exponential backoff up to JOB_MAX_ATTEMPTS.
+JOB_QUEUE_AUTOSTART = True
+JOB_WORKERS = 2
+JOB_WORKER_MODE = 'thread'
+JOB_POLL_SECONDS = 1.0
+JOB_QUEUE_MAX_PENDING = 1000
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_SECONDS = 0.5
+JOB_RETRY_MAX_SECONDS = 60
+JOB_LEASE_SECONDS = 300
+
+# Responses to POSTs carrying an Idempotency-Key (cart and order endpoints)
+# are kept per process for IDEMPOTENCY_TTL seconds, at most
+# IDEMPOTENCY_MAX_KEYS of them; a retry waits up to IDEMPOTENCY_WAIT_SECONDS
+# for the first request with the same key to finish
+IDEMPOTENCY_MAX_KEYS = 10000
+IDEMPOTENCY_TTL = 24 * 60 * 60
+IDEMPOTENCY_WAIT_SECONDS = 30
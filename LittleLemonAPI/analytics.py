@@ -0,0 +1,118 @@
+"""
+Incrementally maintained sales summaries.
+
+Every write to Order or OrderItem adds a signed delta to DailySales,
+MenuItemSales and CategorySales, inside the same transaction as that
+write. The summaries then always match the detail tables and a dashboard
+reads a few rows instead of the order history. Increments are upserts.
+Decrements only update rows that already exist, so they cannot resurrect
+a row that a cascading delete just removed. `rebuild()` recomputes
+everything from scratch.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Sum
+
+from .models import CategorySales, DailySales, MenuItem, MenuItemSales, Order, OrderItem
+
+
+def to_cents(amount):
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+def from_cents(cents):
+    return (Decimal(cents) / 100).quantize(Decimal('0.01'))
+
+
+def _apply(model, key_field, deltas):
+    """Add `deltas` ({key: {column: delta}}) to the rows of `model`."""
+    if not deltas:
+        return
+    increments = {key: values for key, values in deltas.items() if all(v >= 0 for v in values.values())}
+    for key, values in deltas.items():
+        if key not in increments:
+            model.objects.filter(**{key_field: key}).update(
+                **{column: F(column) + delta for column, delta in values.items()}
+            )
+    if not increments:
+        return
+
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    key_column = quote(model._meta.get_field(key_field).column)
+    columns = list(next(iter(increments.values())))
+    sql = (
+        f'INSERT INTO {table} ({key_column}, {", ".join(quote(c) for c in columns)}) '
+        f'VALUES ({", ".join(["%s"] * (len(columns) + 1))}) '
+        f'ON CONFLICT ({key_column}) DO UPDATE SET '
+        + ', '.join(f'{quote(c)} = {table}.{quote(c)} + excluded.{quote(c)}' for c in columns)
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [[key] + [values[c] for c in columns] for key, values in increments.items()])
+
+
+def record_order(date, total, sign=1):
+    _apply(DailySales, 'date', {date: {'orders': sign, 'revenue_cents': sign * to_cents(total)}})
+
+
+def record_order_items(items, sign=1):
+    """
+    Count `items` (OrderItem instances or (menuitem_id, quantity, price)
+    tuples) towards the menu item and category totals.
+    """
+    lines = [
+        item if isinstance(item, tuple) else (item.menuitem_id, item.quantity, item.price)
+        for item in items
+    ]
+    if not lines:
+        return
+    categories = dict(
+        MenuItem.objects.filter(pk__in={menuitem_id for menuitem_id, _, _ in lines})
+        .values_list('pk', 'category_id')
+    )
+
+    by_item = defaultdict(lambda: {'units': 0, 'revenue_cents': 0})
+    by_category = defaultdict(lambda: {'units': 0, 'revenue_cents': 0})
+    for menuitem_id, quantity, price in lines:
+        for totals in (by_item[menuitem_id], by_category[categories.get(menuitem_id)]):
+            totals['units'] += sign * quantity
+            totals['revenue_cents'] += sign * to_cents(price)
+    by_category.pop(None, None)
+
+    _apply(MenuItemSales, 'menuitem', by_item)
+    _apply(CategorySales, 'category', by_category)
+
+
+@transaction.atomic
+def rebuild():
+    """Recompute every summary table from Order and OrderItem."""
+    DailySales.objects.all().delete()
+    MenuItemSales.objects.all().delete()
+    CategorySales.objects.all().delete()
+
+    DailySales.objects.bulk_create(
+        DailySales(date=row['date'], orders=row['orders'], revenue_cents=to_cents(row['revenue'] or 0))
+        for row in Order.objects.values('date').annotate(orders=Count('id'), revenue=Sum('total')).order_by()
+    )
+
+    item_rows = (
+        OrderItem.objects.values('menuitem_id', 'menuitem__category_id')
+        .annotate(units=Sum('quantity'), revenue=Sum('price'))
+        .order_by()
+    )
+    menu_items = []
+    categories = defaultdict(lambda: [0, 0])
+    for row in item_rows:
+        revenue_cents = to_cents(row['revenue'] or 0)
+        menu_items.append(MenuItemSales(menuitem_id=row['menuitem_id'], units=row['units'], revenue_cents=revenue_cents))
+        totals = categories[row['menuitem__category_id']]
+        totals[0] += row['units']
+        totals[1] += revenue_cents
+    MenuItemSales.objects.bulk_create(menu_items)
+    CategorySales.objects.bulk_create(
+        CategorySales(category_id=category_id, units=units, revenue_cents=revenue_cents)
+        for category_id, (units, revenue_cents) in categories.items()
+    )
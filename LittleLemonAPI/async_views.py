@@ -0,0 +1,134 @@
+"""
+ASGI-native read endpoints for the catalog.
+
+These serve the same payloads as MenuItemsView, SingleMenuItemView and
+CategoryView (GET) but never hold a worker thread while waiting on the
+database: queries go through Django's async ORM API, and only the short
+synchronous steps (token lookup on a cache miss, throttling) hop to a
+thread via sync_to_async.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .cache import aget_catalog_version, catalog_cache
+from .models import Category, MenuItem
+from .routers import read_replica
+from .serializer import CategorySerializer, MenuItemSerializer, menu_item_list_serializer
+from .views import MenuItemsView
+
+
+def _render(data, status=200, headers=None):
+    response = HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+def _error(exc, request=None):
+    headers = {}
+    if isinstance(exc, exceptions.Throttled) and exc.wait is not None:
+        headers['Retry-After'] = str(int(exc.wait))
+    if isinstance(exc, exceptions.NotAuthenticated) and request is not None:
+        authenticator = request.authenticators[0] if request.authenticators else None
+        if authenticator is not None:
+            header = authenticator.authenticate_header(request)
+            if header:
+                headers['WWW-Authenticate'] = header
+            else:
+                exc.status_code = 403
+    return _render({'detail': exc.detail}, status=exc.status_code, headers=headers)
+
+
+def _drf_request(request):
+    return Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+
+
+async def _check_throttles(request, view):
+    for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+        throttle = throttle_class()
+        if not await sync_to_async(throttle.allow_request)(request, view):
+            raise exceptions.Throttled(throttle.wait())
+
+
+async def _cached(request, view_name, build):
+    key = (await aget_catalog_version(), view_name, request.get_host(), request.get_full_path())
+    data = catalog_cache.get(key)
+    if data is not None:
+        return _render(data, headers={'X-Cache': 'HIT'})
+    with read_replica():
+        data = await build()
+    catalog_cache.set(key, data)
+    return _render(data, headers={'X-Cache': 'MISS'})
+
+
+async def menu_items(request):
+    if request.method != 'GET':
+        return _error(exceptions.MethodNotAllowed(request.method))
+    drf_request = _drf_request(request)
+    view = MenuItemsView(request=drf_request, format_kwarg=None, kwargs={})
+    try:
+        await _check_throttles(drf_request, view)
+    except exceptions.APIException as exc:
+        return _error(exc, drf_request)
+
+    async def build():
+        queryset = MenuItem.objects.all()
+        for backend in view.filter_backends:
+            queryset = backend().filter_queryset(drf_request, queryset, view)
+        paginator = view.pagination_class()
+        page_queryset = paginator.get_page_queryset(menu_item_list_serializer.rows(queryset), drf_request, view)
+        paginator.set_page([row async for row in page_queryset])
+        data = menu_item_list_serializer.to_representation(paginator.page)
+        return paginator.get_paginated_response(data).data
+
+    try:
+        return await _cached(request, 'AsyncMenuItemsView', build)
+    except exceptions.APIException as exc:
+        return _error(exc, drf_request)
+
+
+async def menu_item_detail(request, pk):
+    if request.method != 'GET':
+        return _error(exceptions.MethodNotAllowed(request.method))
+    drf_request = _drf_request(request)
+    try:
+        await _check_throttles(drf_request, None)
+    except exceptions.APIException as exc:
+        return _error(exc, drf_request)
+
+    async def build():
+        try:
+            item = await MenuItem.objects.select_related('category').aget(pk=pk)
+        except MenuItem.DoesNotExist:
+            raise exceptions.NotFound('No MenuItem matches the given query.')
+        return MenuItemSerializer(item).data
+
+    try:
+        return await _cached(request, 'AsyncSingleMenuItemView', build)
+    except exceptions.APIException as exc:
+        return _error(exc, drf_request)
+
+
+async def categories(request):
+    if request.method != 'GET':
+        return _error(exceptions.MethodNotAllowed(request.method))
+    drf_request = _drf_request(request)
+    try:
+        # Token lookups may hit the database, so resolve the user in a thread
+        user = await sync_to_async(lambda: drf_request.user)()
+        if not user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        await _check_throttles(drf_request, None)
+    except exceptions.APIException as exc:
+        return _error(exc, drf_request)
+
+    with read_replica():
+        data = CategorySerializer([category async for category in Category.objects.all()], many=True).data
+    return _render(data)
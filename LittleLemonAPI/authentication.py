@@ -0,0 +1,90 @@
+import copy
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import LRUCache
+
+TOKEN_CACHE_TTL = getattr(settings, 'TOKEN_CACHE_TTL', 300)
+
+
+class TokenCache(LRUCache):
+    """
+    LRUCache of resolved (user, token) pairs by token key, indexed by user id.
+
+    The index lets a user's tokens be dropped without scanning the cache.
+    It may still name keys that were evicted meanwhile; it is rebuilt from
+    the live entries once it tracks twice as many users as the cache holds
+    entries.
+    """
+
+    def __init__(self, max_entries, ttl=None):
+        super().__init__(max_entries, ttl=ttl)
+        self._keys_by_user = defaultdict(set)
+
+    def set(self, key, value):
+        super().set(key, value)
+        with self._lock:
+            if len(self._keys_by_user) >= 2 * self.max_entries:
+                self._keys_by_user.clear()
+                for cached_key, (_, (user, _)) in self._data.items():
+                    self._keys_by_user[user.pk].add(cached_key)
+            self._keys_by_user[value[0].pk].add(key)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for key in self._keys_by_user.pop(user_id, ()):
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._keys_by_user.clear()
+
+
+token_cache = TokenCache(getattr(settings, 'TOKEN_CACHE_MAX_ENTRIES', 10000), ttl=TOKEN_CACHE_TTL)
+
+
+def _revoked_key(key):
+    return f'littlelemon:token-revoked:{key}'
+
+
+def revoke_tokens(*keys):
+    """
+    Forget resolved tokens.
+
+    The local entries are dropped straight away. A tombstone is also left in
+    Django's cache, which every worker on the host shares, for one TTL, so
+    the other workers stop trusting their copies before those copies expire.
+    """
+    for key in keys:
+        token_cache.delete(key)
+    cache.set_many({_revoked_key(key): True for key in keys}, TOKEN_CACHE_TTL)
+
+
+def forget_user(user_id):
+    """Drop cached tokens of a user so the next request reloads it."""
+    token_cache.delete_user(user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that keeps resolved tokens in a bounded TTL cache.
+
+    A cache hit skips the authtoken_token/auth_user join. Entries are
+    evicted when the token is deleted (djoser logout included) or when the
+    user is saved, and deactivated users are also revoked across workers
+    (see signals.py).
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None or cache.get(_revoked_key(key)):
+            cached = super().authenticate_credentials(key)
+            token_cache.set(key, cached)
+        user, token = cached
+        # Hand out a copy so per-request state set on the user (such as
+        # the memoised roles) never leaks into later requests
+        return (copy.copy(user), token)
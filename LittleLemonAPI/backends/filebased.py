@@ -0,0 +1,36 @@
+import os
+from contextlib import contextmanager
+
+from django.core.cache.backends import filebased
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.files import locks
+
+
+class FileBasedCache(filebased.FileBasedCache):
+    """
+    Django's file cache with add() and incr() made atomic across processes.
+
+    The stock versions check and then write, so two workers can both add
+    the same key, or both turn 5 into 6. The catalog and cart version
+    counters and their Last-Modified stamps rely on neither happening, so
+    both run under an exclusive lock on a file in the cache directory.
+    """
+
+    @contextmanager
+    def _locked(self):
+        self._createdir()
+        # No cache_suffix, so clear() and culling leave the lock file alone
+        with open(os.path.join(self._dir, 'lock'), 'ab') as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked():
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._locked():
+            return super().incr(key, delta, version)
@@ -0,0 +1,17 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite backend whose transactions take the write lock up front.
+
+    Django starts atomic() blocks with a deferred BEGIN, so a transaction
+    that reads before it writes (a checkout checks stock, then updates it)
+    has to upgrade its lock halfway through. When another connection holds
+    the lock SQLite fails that upgrade with "database is locked" at once,
+    without waiting out busy_timeout. BEGIN IMMEDIATE makes writers queue
+    on busy_timeout at the start instead.
+    """
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
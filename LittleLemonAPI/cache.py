@@ -0,0 +1,219 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = 'littlelemon:catalog-version'
+CART_VERSION_KEY = 'littlelemon:cart-version:{}'
+STOCK_CHANGED_KEY = 'littlelemon:stock-changed'
+STOCK_DEBOUNCE_KEY = 'littlelemon:stock-debounce'
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache with hit/miss counters.
+
+    With `ttl` (seconds) set, entries also expire that long after they were
+    stored; an expired entry counts as a miss.
+    """
+
+    def __init__(self, max_entries, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+catalog_cache = LRUCache(getattr(settings, 'CATALOG_CACHE_MAX_ENTRIES', 512))
+
+
+def get_catalog_version():
+    if cache.get(STOCK_CHANGED_KEY):
+        _publish_stock_change()
+    # The counter lives in Django's cache, which settings.CACHES keeps in
+    # files shared by every worker on the host, so they all see one version. It starts from a timestamp rather than 1 so an
+    # evicted counter can never come back as a version that is still cached.
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+async def aget_catalog_version():
+    if await cache.aget(STOCK_CHANGED_KEY):
+        _publish_stock_change()
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    return bump_version(CATALOG_VERSION_KEY)
+
+
+def stock_changed():
+    """
+    Note that MenuItem.inventory moved; call it once the change is committed.
+
+    Menu items show their stock, so this bumps the catalog version too, but
+    at most once every CATALOG_STOCK_DEBOUNCE seconds: carts move stock on
+    almost every request, and a bump each time would empty the catalog cache
+    as fast as it fills. A change made inside the window is published by the
+    first catalog read after the window ends.
+    """
+    cache.set(STOCK_CHANGED_KEY, True, timeout=None)
+    _publish_stock_change()
+
+
+def _publish_stock_change():
+    if cache.add(STOCK_DEBOUNCE_KEY, True, timeout=getattr(settings, 'CATALOG_STOCK_DEBOUNCE', 1)):
+        # Cleared before the bump, so a change noted meanwhile is never lost
+        cache.delete(STOCK_CHANGED_KEY)
+        bump_catalog_version()
+
+
+def cart_version_key(user_id):
+    return CART_VERSION_KEY.format(user_id)
+
+
+def bump_cart_version(user_id):
+    return bump_version(cart_version_key(user_id))
+
+
+def _modified_key(key):
+    return key + ':modified'
+
+
+def bump_version(key):
+    """Advance the version counter `key` and record when it changed."""
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.incr(key)
+    _touch(_modified_key(key))
+    return version
+
+
+def _touch(modified_key):
+    # Last-Modified has whole-second resolution, so the stamp is rounded up
+    # and always moves on by at least a second: a client that saw the old
+    # stamp never gets a 304 for a response that changed in the same second.
+    # incr() keeps concurrent bumps from landing on the same stamp.
+    while True:
+        if cache.add(modified_key, math.ceil(time.time()), timeout=None):
+            return
+        previous = cache.get(modified_key)
+        if previous is None:
+            continue
+        try:
+            cache.incr(modified_key, max(math.ceil(time.time()) - previous, 1))
+        except ValueError:
+            # Evicted between get() and incr()
+            continue
+        return
+
+
+def get_version_stamps(keys):
+    """
+    Return ({key: version}, last modified) for the version counters `keys`.
+
+    Counters and times missing from the cache start afresh from now, like
+    get_catalog_version(); clients then simply fetch the resource again.
+    """
+    if CATALOG_VERSION_KEY in keys and cache.get(STOCK_CHANGED_KEY):
+        _publish_stock_change()
+    wanted = [*keys, *map(_modified_key, keys)]
+    found = cache.get_many(wanted)
+    now = math.ceil(time.time())
+    for name in wanted:
+        if name not in found:
+            cache.add(name, time.time_ns() if name in keys else now, timeout=None)
+            found[name] = cache.get(name)
+    return {key: found[key] for key in keys}, max(found[_modified_key(key)] for key in keys)
+
+
+class CatalogCacheMixin:
+    """
+    Serve GET responses of catalog views from `catalog_cache`.
+
+    Entries are keyed on the current catalog version, so any MenuItem or
+    Category write makes every older entry unreachable; LRU eviction then
+    reclaims them.
+    """
+
+    def get(self, request, *args, **kwargs):
+        # Read the version before querying: a write that lands while we build
+        # the response bumps the version, so the entry is never served again.
+        key = (
+            get_catalog_version(),
+            self.__class__.__name__,
+            request.get_host(),
+            request.get_full_path(),
+        )
+        data = catalog_cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            catalog_cache.set(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
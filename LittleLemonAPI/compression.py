@@ -0,0 +1,84 @@
+"""
+Response compression for the large API payloads.
+
+CompressionMiddleware is Django's GZipMiddleware with a configurable size
+threshold (RESPONSE_COMPRESSION_MIN_BYTES) and Brotli, preferred over
+gzip when the optional `brotli` package is installed and the client
+accepts it. It is applied per view through `compress_response` rather
+than globally, so small responses such as errors and single objects are
+left alone.
+"""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import decorator_from_middleware
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+BROTLI_QUALITY = 5
+
+
+def accepted_encodings(header):
+    """Content codings named in an Accept-Encoding header with a non-zero q."""
+    encodings = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            encodings.add(coding.strip().lower())
+    return encodings
+
+
+class CompressionMiddleware(GZipMiddleware):
+
+    def process_response(self, request, response):
+        min_bytes = getattr(settings, 'RESPONSE_COMPRESSION_MIN_BYTES', 1024)
+        if not response.streaming and len(response.content) < min_bytes:
+            return response
+        if brotli is None or response.has_header('Content-Encoding'):
+            return super().process_response(request, response)
+        if 'br' not in accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.streaming:
+            if response.is_async:
+                # Let GZipMiddleware handle async iterators
+                return super().process_response(request, response)
+            response.streaming_content = _brotli_sequence(response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed_content = brotli.compress(response.content, quality=BROTLI_QUALITY)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+def _brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+# View decorator; DRF responses are compressed after they are rendered
+compress_response = decorator_from_middleware(CompressionMiddleware)
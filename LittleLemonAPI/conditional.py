@@ -0,0 +1,58 @@
+"""
+Conditional GET for catalog and cart reads.
+
+Responses carry a strong ETag and Last-Modified built from version counters
+in Django's cache (see cache.py) rather than from the body: the catalog
+version, bumped on every MenuItem and Category write, and for carts also a
+per-user cart version bumped by every cart change. Requests whose
+If-None-Match or If-Modified-Since still match get a 304 before the view
+queries or serializes anything.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import CATALOG_VERSION_KEY, cart_version_key, get_version_stamps
+
+
+def catalog_versions(request):
+    return [CATALOG_VERSION_KEY]
+
+
+def cart_versions(request):
+    # Deleting a dish also deletes it from carts
+    return [CATALOG_VERSION_KEY, cart_version_key(request.user.pk)]
+
+
+def conditional(version_keys):
+    """
+    Answer conditional GETs to a DRF view from version counters.
+
+    `version_keys(request)` names the counters the response depends on. The
+    ETag also covers the URL and the negotiated media type, so every
+    representation gets its own. Use method_decorator() for class views.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            # Read before the view runs: a write landing meanwhile moves the
+            # stamp on, so the response is never labelled newer than it is
+            versions, modified = get_version_stamps(version_keys(request))
+            stamp = repr((sorted(versions.items()), request.get_full_path(), request.accepted_media_type))
+            etag = quote_etag(hashlib.sha1(stamp.encode()).hexdigest())
+            response = get_conditional_response(request, etag=etag, last_modified=modified)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(modified)
+            return response
+
+        return wrapper
+    return decorator
@@ -0,0 +1,116 @@
+import heapq
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Order
+from .roles import DELIVERY_CREW
+
+
+class DeliveryDispatcher:
+    """
+    Pick the delivery crew member with the fewest open orders.
+
+    Open (status=False) order counts per crew member are loaded once and
+    then kept current by the Order signals in signals.py. Picking a member
+    is a pop from a min-heap keyed on (load, user id), so it costs O(log n)
+    with no queries. Heap entries whose load has since changed are dropped
+    lazily when they reach the top. The table is reloaded every
+    DISPATCHER_REFRESH_SECONDS, and whenever group membership changes, to
+    pick up writes this process did not see (other workers,
+    queryset.update()).
+    """
+
+    def __init__(self, refresh_seconds):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._loads = None
+        self._heap = []
+        self._loaded_at = 0
+
+    def _load(self):
+        crew_ids = list(
+            User.objects.filter(groups__name=DELIVERY_CREW, is_active=True).values_list('pk', flat=True)
+        )
+        counts = dict(
+            Order.objects.filter(status=False, delivery_crew_user__in=crew_ids)
+            .values_list('delivery_crew_user')
+            .annotate(open_orders=Count('id'))
+            .order_by()
+        )
+        self._loads = {pk: counts.get(pk, 0) for pk in crew_ids}
+        self._heap = [(load, pk) for pk, load in self._loads.items()]
+        heapq.heapify(self._heap)
+        self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        if self._loads is None or time.monotonic() - self._loaded_at > self.refresh_seconds:
+            self._load()
+
+    def choose(self):
+        """Return the id of the least-loaded crew member, or None if there is none."""
+        with self._lock:
+            self._ensure_loaded()
+            while self._heap:
+                load, pk = self._heap[0]
+                if self._loads.get(pk) == load:
+                    return pk
+                heapq.heappop(self._heap)
+            return None
+
+    def adjust(self, crew_id, delta):
+        """Record that `crew_id` gained (positive) or lost (negative) `delta` open orders."""
+        with self._lock:
+            if self._loads is None or crew_id not in self._loads:
+                return
+            self._loads[crew_id] += delta
+            heapq.heappush(self._heap, (self._loads[crew_id], crew_id))
+            # Stale entries are only dropped when they surface; rebuild
+            # before they outnumber the live ones too much
+            if len(self._heap) > 4 * len(self._loads) + 64:
+                self._heap = [(load, pk) for pk, load in self._loads.items()]
+                heapq.heapify(self._heap)
+
+    def assign_batch(self, orders):
+        """
+        Spread `orders` over the crew and return the ones that were assigned.
+
+        The caller saves them, normally with bulk_update(). bulk_update does
+        not send signals, so the loads are updated here, once the caller's
+        transaction commits; a rollback leaves them as they were.
+        """
+        assigned = []
+        added = Counter()
+        with self._lock:
+            self._ensure_loaded()
+            # Plan on a copy of the heap so nothing changes before the commit
+            heap = [(load, pk) for pk, load in self._loads.items()]
+            heapq.heapify(heap)
+            for order in orders:
+                if not heap:
+                    break
+                load, crew_id = heap[0]
+                order.delivery_crew_user_id = crew_id
+                if not order.status:
+                    added[crew_id] += 1
+                    heapq.heapreplace(heap, (load + 1, crew_id))
+                assigned.append(order)
+
+        def apply():
+            for crew_id, count in added.items():
+                self.adjust(crew_id, count)
+        transaction.on_commit(apply)
+        return assigned
+
+    def reset(self):
+        with self._lock:
+            self._loads = None
+            self._heap = []
+
+
+dispatcher = DeliveryDispatcher(getattr(settings, 'DISPATCHER_REFRESH_SECONDS', 60))
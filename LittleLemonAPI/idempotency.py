@@ -0,0 +1,103 @@
+"""
+Idempotency-Key support for POST endpoints.
+
+A client that retries a POST with the same Idempotency-Key header gets the
+original response back (with Idempotent-Replayed: true) instead of running
+the view again. Keys are scoped to the user and the path. Reusing a key
+with a different body is rejected with 422.
+
+Completed responses are kept in a size-bounded LRU with a TTL
+(IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_TTL). A duplicate that arrives while
+the first request is still running waits for it, so concurrent retries
+collapse into one execution. Responses with status 500 and above, and
+exceptions, are not stored, so a retry after a failure runs the view
+again. The store is per process.
+"""
+import hashlib
+import json
+import threading
+from functools import wraps
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import LRUCache
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+responses = LRUCache(
+    getattr(settings, 'IDEMPOTENCY_MAX_KEYS', 10000),
+    ttl=getattr(settings, 'IDEMPOTENCY_TTL', 3600),
+)
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _replay(stored):
+    fingerprint, status_code, data, headers = stored
+    response = Response(data, status=status_code, headers=headers)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_func):
+    """
+    Honour Idempotency-Key on POST requests to a DRF function view.
+
+    Use method_decorator() for APIView methods. Requests without the header
+    are passed straight through.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if request.method != 'POST' or key is None:
+            return view_func(request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response({'message': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        scope = (request.user.pk, request.path, key)
+        fingerprint = _fingerprint(request)
+        wait_seconds = getattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 30)
+        while True:
+            stored = responses.get(scope)
+            if stored is not None:
+                if stored[0] != fingerprint:
+                    return Response({'message': f'{HEADER} was already used with a different request body'},
+                                    status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+                return _replay(stored)
+
+            with _in_flight_lock:
+                done = _in_flight.get(scope)
+                if done is None:
+                    done = _in_flight[scope] = threading.Event()
+                    leader = True
+                else:
+                    leader = False
+            if leader:
+                break
+            # Someone is already running this request: wait for its response,
+            # or take over if it failed without leaving one
+            if not done.wait(wait_seconds):
+                return Response({'message': 'A request with this Idempotency-Key is still being processed'},
+                                status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'})
+
+        try:
+            response = view_func(request, *args, **kwargs)
+            if response.status_code < 500:
+                headers = {name: response[name] for name in ('Location',) if response.has_header(name)}
+                responses.set(scope, (fingerprint, response.status_code, response.data, headers))
+            return response
+        finally:
+            with _in_flight_lock:
+                del _in_flight[scope]
+            done.set()
+
+    return wrapper
@@ -0,0 +1,142 @@
+"""
+Inventory reservations for carts.
+
+Adding a dish to a cart takes it out of MenuItem.inventory right away and
+stamps the cart row with `reserved_until`; checkout then only has to
+convert the reservation. Stock is only ever changed with conditional
+updates:
+
+    UPDATE menuitem SET inventory = inventory - n WHERE id = ... AND inventory >= n
+
+with the quantities for a whole cart folded into one statement through
+CASE expressions. There is no read-modify-write, so concurrent carts and
+checkouts never oversell, and the transactions stay a few statements long.
+
+A cart row holds stock while `reserved_until` is set. Rows left past that
+time are released by `release_expired()` (see the
+release_expired_reservations command) and have to be reserved again at
+checkout. Every committed stock change is reported to cache.stock_changed(),
+so cached menu responses and their ETags follow stock within
+CATALOG_STOCK_DEBOUNCE seconds.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .cache import stock_changed
+from .models import Cart, MenuItem
+
+
+class InsufficientInventory(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Not enough inventory'
+    default_code = 'insufficient_inventory'
+
+    def __init__(self, menuitem_ids):
+        self.menuitem_ids = sorted(menuitem_ids)
+        super().__init__()
+        # Set after __init__, which would turn the ids into strings
+        self.detail = {'message': self.detail, 'menuitem_ids': self.menuitem_ids}
+
+
+class _Shortage(Exception):
+    pass
+
+
+def reservation_deadline():
+    return timezone.now() + timedelta(seconds=getattr(settings, 'CART_RESERVATION_SECONDS', 900))
+
+
+def _per_item(quantities):
+    return Case(
+        *[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def reserve(quantities):
+    """
+    Take {menuitem_id: quantity} out of stock, all or nothing.
+
+    Raises InsufficientInventory naming the menu items that are short;
+    nothing is taken in that case.
+    """
+    quantities = {pk: quantity for pk, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return
+    needed = _per_item(quantities)
+    try:
+        with transaction.atomic():
+            updated = MenuItem.objects.filter(pk__in=quantities, inventory__gte=needed).update(
+                inventory=F('inventory') - needed
+            )
+            if updated != len(quantities):
+                raise _Shortage
+            transaction.on_commit(stock_changed)
+    except _Shortage:
+        # The savepoint is rolled back, so current stock tells which are short
+        available = dict(MenuItem.objects.filter(pk__in=quantities).values_list('pk', 'inventory'))
+        raise InsufficientInventory(
+            pk for pk, quantity in quantities.items() if available.get(pk, 0) < quantity
+        )
+
+
+def release(quantities):
+    """Put {menuitem_id: quantity} back into stock."""
+    quantities = {pk: quantity for pk, quantity in quantities.items() if quantity > 0}
+    if quantities:
+        MenuItem.objects.filter(pk__in=quantities).update(inventory=F('inventory') + _per_item(quantities))
+        transaction.on_commit(stock_changed)
+
+
+def adjust(deltas):
+    """Reserve positive and release negative {menuitem_id: delta} deltas."""
+    reserve({pk: delta for pk, delta in deltas.items() if delta > 0})
+    release({pk: -delta for pk, delta in deltas.items() if delta < 0})
+
+
+def held_quantities(cart_rows):
+    """Sum the quantities of `cart_rows` that still hold stock, per menu item."""
+    held = Counter()
+    for row in cart_rows:
+        if row.reserved_until is not None:
+            held[row.item_id] += row.quantity
+    return held
+
+
+def release_cart(user):
+    """Empty `user`'s cart and give back whatever it still held."""
+    with transaction.atomic():
+        rows = list(Cart.objects.select_for_update().filter(user=user))
+        release(held_quantities(rows))
+        Cart.objects.filter(pk__in=[row.pk for row in rows]).delete()
+
+
+def release_expired(now=None, batch_size=500):
+    """
+    Give back the stock of cart rows whose reservation has run out.
+
+    The rows stay in their carts with reserved_until cleared, so checkout
+    reserves them again. Works in short transactions of `batch_size` rows
+    and returns how many rows were released.
+    """
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Cart.objects.select_for_update()
+                .filter(reserved_until__lte=now)
+                .order_by('reserved_until')[:batch_size]
+            )
+            if not rows:
+                return released
+            Cart.objects.filter(pk__in=[row.pk for row in rows]).update(reserved_until=None)
+            release(held_quantities(rows))
+        released += len(rows)
@@ -0,0 +1,283 @@
+"""
+Database-backed job queue with an in-process worker pool.
+
+Work is queued as a Job row with `enqueue()`, so it survives restarts, and
+is run by a WorkerPool: one dispatcher thread claims due jobs and hands
+them to a thread pool or, with JOB_WORKER_MODE = 'process', to a pool of
+worker processes. Every web process starts its own pool on the first
+enqueue (JOB_QUEUE_AUTOSTART); `manage.py run_job_workers` runs one as a
+dedicated process instead. Several pools can share the table: a job is
+claimed with a conditional UPDATE, so it runs in exactly one of them.
+
+Backpressure: `enqueue()` raises QueueFull once JOB_QUEUE_MAX_PENDING
+jobs are waiting or running. A task that fails with OperationalError
+(SQLite's "database is locked" under write contention) is retried after
+an exponential backoff with jitter, up to the job's max_attempts; other
+exceptions fail the job at once.
+"""
+import logging
+import multiprocessing
+import random
+import threading
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+
+def task(name):
+    """Register the decorated function as the handler for jobs called `name`."""
+    def register(func):
+        _tasks[name] = func
+        return func
+    return register
+
+
+class QueueFull(Exception):
+    """Too many jobs are pending; the caller should retry later."""
+
+
+class JobFailed(Exception):
+    """Raised by a task to fail its job for good; the message is recorded."""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(name, payload=None, user=None):
+    """Queue a job for the task `name` and return the Job."""
+    if name not in _tasks:
+        raise KeyError(f'No task registered as {name!r}')
+    if Job.objects.filter(status__in=(Job.QUEUED, Job.RUNNING)).count() >= _setting('JOB_QUEUE_MAX_PENDING', 1000):
+        raise QueueFull()
+    job = Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_after=timezone.now(),
+        max_attempts=_setting('JOB_MAX_ATTEMPTS', 5),
+        created_by=user,
+    )
+    transaction.on_commit(_wake)
+    return job
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number `attempts` (1-based), with jitter."""
+    delay = min(_setting('JOB_RETRY_BASE_SECONDS', 0.5) * 2 ** (attempts - 1), _setting('JOB_RETRY_MAX_SECONDS', 60))
+    return random.uniform(delay / 2, delay)
+
+
+def _with_retries(func, attempts=5):
+    # Bookkeeping writes retry in place on lock contention
+    for attempt in range(1, attempts + 1):
+        try:
+            return func()
+        except OperationalError:
+            if attempt == attempts:
+                raise
+            time.sleep(backoff(attempt) / 10)
+
+
+def claim():
+    """Mark the next due job as running and return its id, or None."""
+    now = timezone.now()
+    for _ in range(5):
+        pk = (
+            Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+            .order_by('run_after', 'id').values_list('pk', flat=True).first()
+        )
+        if pk is None:
+            return None
+        # Only one claimer can move the row out of 'queued'
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, attempts=F('attempts') + 1, started_at=now,
+        ):
+            return pk
+    return None
+
+
+def requeue_stale():
+    """Queue again jobs left running past JOB_LEASE_SECONDS, e.g. by a crashed worker."""
+    cutoff = timezone.now() - timedelta(seconds=_setting('JOB_LEASE_SECONDS', 300))
+    return Job.objects.filter(status=Job.RUNNING, started_at__lt=cutoff).update(status=Job.QUEUED)
+
+
+def execute(job_id):
+    """Run a claimed job and record its outcome."""
+    close_old_connections()
+    try:
+        job = Job.objects.get(pk=job_id)
+        handler = _tasks.get(job.name)
+        try:
+            if handler is None:
+                raise JobFailed(f'No task registered as {job.name!r}')
+            # A failed attempt leaves nothing behind for the retry to trip on
+            with transaction.atomic():
+                result = handler(job.payload)
+        except OperationalError as exc:
+            if job.attempts >= job.max_attempts:
+                _finish(job, Job.FAILED, error=f'Gave up after {job.attempts} attempts: {exc}')
+            else:
+                retry_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+                _with_retries(lambda: Job.objects.filter(pk=job.pk).update(
+                    status=Job.QUEUED, run_after=retry_at, error=str(exc),
+                ))
+        except JobFailed as exc:
+            _finish(job, Job.FAILED, error=str(exc))
+        except Exception as exc:
+            logger.exception('Job %s (%s) failed', job.pk, job.name)
+            _finish(job, Job.FAILED, error=repr(exc))
+        else:
+            _finish(job, Job.DONE, result=result)
+    finally:
+        close_old_connections()
+
+
+def _finish(job, status, result=None, error=''):
+    _with_retries(lambda: Job.objects.filter(pk=job.pk).update(
+        status=status, result=result, error=error, finished_at=timezone.now(),
+    ))
+
+
+def run_pending(limit=None):
+    """Run due jobs in the calling thread until none are left; return how many ran."""
+    ran = 0
+    while limit is None or ran < limit:
+        job_id = claim()
+        if job_id is None:
+            break
+        execute(job_id)
+        ran += 1
+    return ran
+
+
+class WorkerPool:
+    """
+    Claim due jobs and run them on `workers` threads or processes.
+
+    The dispatcher thread only claims a job when a worker is free, so jobs
+    that cannot start yet stay queued for other pools to pick up.
+    """
+
+    def __init__(self, workers=2, mode='thread', poll_interval=1.0):
+        if mode not in ('thread', 'process'):
+            raise ValueError(f"mode must be 'thread' or 'process', not {mode!r}")
+        self.workers = workers
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self._free = threading.Semaphore(workers)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._executor = self._make_executor()
+            self._thread = threading.Thread(target=self._run, name='littlelemon-job-dispatcher', daemon=True)
+            self._thread.start()
+
+    def _make_executor(self):
+        if self.mode == 'process':
+            # Spawned rather than forked so workers never share the parent's
+            # database connections; each one sets Django up from scratch
+            return ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup,
+            )
+        return ThreadPoolExecutor(self.workers, thread_name_prefix='littlelemon-job')
+
+    def stop(self, wait=True):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None and wait:
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def wake(self):
+        self._wakeup.set()
+
+    def join(self):
+        """Block until the pool is stopped (used by run_job_workers)."""
+        while self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        failures = 0
+        last_requeue = 0
+        while not self._stopping.is_set():
+            self._free.acquire()
+            # Cleared before claiming, so a wake() from here on is not lost
+            self._wakeup.clear()
+            try:
+                if time.monotonic() - last_requeue > self.poll_interval * 30:
+                    requeue_stale()
+                    last_requeue = time.monotonic()
+                job_id = claim()
+                failures = 0
+            except OperationalError:
+                # The database is busy; back off before polling again
+                failures += 1
+                job_id = None
+            finally:
+                close_old_connections()
+
+            if job_id is None:
+                self._free.release()
+                self._wakeup.wait(backoff(failures) if failures else self.poll_interval)
+                continue
+            try:
+                future = self._executor.submit(execute, job_id)
+            except BrokenExecutor:
+                # A worker process died; put the job back and start over
+                logger.error('Job worker pool is broken, restarting it')
+                _with_retries(lambda: Job.objects.filter(pk=job_id).update(status=Job.QUEUED))
+                self._free.release()
+                self._executor.shutdown(wait=False)
+                self._executor = self._make_executor()
+                continue
+            future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self._free.release()
+        if future.exception() is not None:
+            logger.error('Job worker crashed', exc_info=future.exception())
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The pool of this process, created from the JOB_* settings."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(
+                workers=_setting('JOB_WORKERS', 2),
+                mode=_setting('JOB_WORKER_MODE', 'thread'),
+                poll_interval=_setting('JOB_POLL_SECONDS', 1.0),
+            )
+        return _pool
+
+
+def _wake():
+    if _setting('JOB_QUEUE_AUTOSTART', True):
+        pool = get_pool()
+        pool.start()
+        pool.wake()
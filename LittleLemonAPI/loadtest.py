@@ -0,0 +1,287 @@
+"""
+Asyncio load generator for a running LittleLemon server.
+
+`run()` opens `concurrency` keep-alive HTTP/1.1 connections and has each
+one act as a virtual user: it picks a scenario from a weighted mix, makes
+that scenario's API calls, and repeats until `duration` seconds are up.
+Every request is timed from sending to the last byte of the body, and the
+report gives throughput plus latency percentiles per endpoint. The client
+only uses the standard library (asyncio streams).
+
+Virtual users sign in with the API tokens of users made by
+generate_synthetic_data: each one is a customer, and crew scenarios use a
+delivery crew member. Customers only add dishes they have not ordered yet,
+so checkouts mostly succeed.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.db.models import Max, Min
+from rest_framework.authtoken.models import Token
+
+from .models import MenuItem, OrderItem
+from .roles import DELIVERY_CREW
+from .synthetic import ADJECTIVES, DISHES
+
+# Dishes the virtual users pick from
+MENU_SAMPLE = 5000
+
+DEFAULT_MIX = {'browse': 50, 'search': 15, 'add_to_cart': 20, 'checkout': 5, 'crew_orders': 10}
+
+
+def parse_mix(text):
+    """Parse 'browse=50,search=15,...' into {scenario: weight}."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in SCENARIOS:
+            raise ValueError(f'Unknown scenario {name!r}; choose from {", ".join(SCENARIOS)}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(samples, fraction):
+    # Nearest-rank on sorted samples
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, max(0, round(fraction * len(samples)) - 1))]
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, body=b''):
+        """Return (status, body bytes)."""
+        head = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', f'Content-Length: {len(body)}']
+        head.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        message = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+        for attempt in range(2):
+            reused = self.writer is not None
+            if not reused:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            self.writer.write(message)
+            await self.writer.drain()
+            status_line = await self.reader.readline()
+            if status_line:
+                break
+            # The server closed an idle connection; send again on a new one
+            await self.close()
+            if not reused:
+                raise ConnectionError('Server closed the connection')
+        status = int(status_line.split()[1])
+
+        response_headers = {}
+        while (line := await self.reader.readline()) not in (b'\r\n', b'\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in response_headers:
+            content = await self.reader.readexactly(int(response_headers['content-length']))
+        elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while size := int((await self.reader.readline()).split(b';')[0], 16):
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            await self.reader.readline()
+            content = b''.join(chunks)
+        elif status in (204, 304) or 100 <= status < 200:
+            content = b''
+        else:
+            content = await self.reader.read()
+            response_headers['connection'] = 'close'
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, content
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+        self.reader = self.writer = None
+
+
+class Results:
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, seconds, status):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        for endpoint in sorted(self.latencies):
+            samples = sorted(self.latencies[endpoint])
+            statuses = self.statuses[endpoint]
+            endpoints[endpoint] = {
+                'requests': len(samples),
+                'errors': sum(count for status, count in statuses.items() if status is None or status >= 500),
+                'client_errors': sum(count for status, count in statuses.items() if status is not None and 400 <= status < 500),
+                'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+                'p50_ms': percentile(samples, 0.50) * 1000,
+                'p90_ms': percentile(samples, 0.90) * 1000,
+                'p99_ms': percentile(samples, 0.99) * 1000,
+                'max_ms': samples[-1] * 1000,
+            }
+        requests = sum(stats['requests'] for stats in endpoints.values())
+        return {
+            'duration_s': elapsed,
+            'requests': requests,
+            'errors': sum(stats['errors'] for stats in endpoints.values()),
+            'throughput_rps': requests / elapsed if elapsed else 0.0,
+            'endpoints': endpoints,
+        }
+
+
+class VirtualUser:
+
+    def __init__(self, connection, results, rng, customer_token, crew_token, menu, ordered):
+        self.connection = connection
+        self.results = results
+        self.rng = rng
+        self.customer_token = customer_token
+        self.crew_token = crew_token
+        self.menu = menu
+        self.ordered = ordered
+
+    async def call(self, endpoint, method, path, token=None, data=None):
+        """Make one timed request; return (status, parsed JSON or None)."""
+        headers = {'Accept': 'application/json'}
+        token = token or self.customer_token
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        body = b''
+        if data is not None:
+            headers['Content-Type'] = 'application/json'
+            body = json.dumps(data).encode()
+        started = time.perf_counter()
+        try:
+            status, content = await self.connection.request(method, path, headers, body)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            await self.connection.close()
+            self.results.record(endpoint, time.perf_counter() - started, None)
+            return None, None
+        self.results.record(endpoint, time.perf_counter() - started, status)
+        try:
+            return status, json.loads(content) if content else None
+        except ValueError:
+            return status, None
+
+    def dishes(self, count):
+        """Titles of up to `count` dishes this customer has not ordered yet."""
+        picks = {}
+        for _ in range(count * 5):
+            pk, title = self.rng.choice(self.menu)
+            if pk not in self.ordered:
+                picks[pk] = title
+            if len(picks) == count:
+                break
+        return picks
+
+    async def browse(self):
+        status, page = await self.call('GET menu-items', 'GET', '/api/menu-items/')
+        if status == 200 and page and page.get('next') and self.rng.random() < 0.5:
+            next_url = urlsplit(page['next'])
+            await self.call('GET menu-items (next page)', 'GET', f'{next_url.path}?{next_url.query}')
+        await self.call('GET menu-items/<id>', 'GET', f'/api/menu-items/{self.rng.choice(self.menu)[0]}/')
+        await self.call('GET categories', 'GET', '/api/categories/')
+
+    async def search(self):
+        word = self.rng.choice(ADJECTIVES + DISHES)
+        await self.call('GET menu-items?search', 'GET', f'/api/menu-items/?search={word.replace(" ", "+")}')
+
+    async def add_to_cart(self):
+        entries = [{'item': title, 'quantity': self.rng.randint(1, 3)} for title in self.dishes(self.rng.randint(1, 2)).values()]
+        await self.call('POST cart', 'POST', '/api/cart/menu-items/', data=entries)
+        await self.call('GET cart', 'GET', '/api/cart/menu-items/')
+
+    async def checkout(self):
+        picks = self.dishes(self.rng.randint(1, 3))
+        entries = [{'item': title, 'quantity': self.rng.randint(1, 3)} for title in picks.values()]
+        await self.call('POST cart', 'POST', '/api/cart/menu-items/', data=entries)
+        status, _ = await self.call('POST order (checkout)', 'POST', '/api/order/')
+        if status == 201:
+            self.ordered.update(picks)
+        else:
+            # Start the next checkout from an empty cart
+            await self.call('DELETE cart', 'DELETE', '/api/cart/menu-items/')
+
+    async def crew_orders(self):
+        # Read-only: the API has no endpoint for crew to mark an Order delivered
+        if not self.crew_token:
+            return
+        status, page = await self.call('GET orders?status=0 (crew)', 'GET', '/api/orders/?status=0', token=self.crew_token)
+        if status == 200 and page and page.get('next') and self.rng.random() < 0.5:
+            next_url = urlsplit(page['next'])
+            await self.call('GET orders?status=0 (crew, next page)', 'GET', f'{next_url.path}?{next_url.query}',
+                            token=self.crew_token)
+
+    async def run(self, mix, deadline):
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        try:
+            while time.monotonic() < deadline:
+                await getattr(self, self.rng.choices(names, weights)[0])()
+        finally:
+            await self.connection.close()
+
+
+SCENARIOS = ('browse', 'search', 'add_to_cart', 'checkout', 'crew_orders')
+
+
+def load_fixtures(prefix, users, seed=None):
+    """Read tokens, menu and order history of generated users for `users` virtual users."""
+    rng = random.Random(seed)
+    customers = list(
+        Token.objects.filter(user__username__startswith=f'{prefix}customer-').values_list('user_id', 'key')
+    )
+    if not customers:
+        raise ValueError(f'No {prefix}customer-* users; run generate_synthetic_data first')
+    customers = rng.sample(customers, min(users, len(customers)))
+    crew = list(
+        Token.objects.filter(user__username__startswith=f'{prefix}crew-', user__groups__name=DELIVERY_CREW)
+        .values_list('key', flat=True)
+    )
+    ordered = defaultdict(set)
+    for user_id, menuitem_id in OrderItem.objects.filter(order_id__in=[user_id for user_id, _ in customers]).values_list('order_id', 'menuitem_id'):
+        ordered[user_id].add(menuitem_id)
+    # Sample ids rather than ORDER BY RANDOM(), which sorts the whole table
+    bounds = MenuItem.objects.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        raise ValueError('The menu is empty; run generate_synthetic_data first')
+    ids = range(bounds['first'], bounds['last'] + 1)
+    menu = list(MenuItem.objects.filter(pk__in=rng.sample(ids, min(MENU_SAMPLE, len(ids)))).values_list('pk', 'title'))
+    return [
+        (key, rng.choice(crew) if crew else None, ordered[user_id])
+        for user_id, key in (customers[index % len(customers)] for index in range(users))
+    ], menu
+
+
+async def run(url, fixtures, menu, concurrency=20, duration=30.0, mix=None, seed=None):
+    """Drive `concurrency` virtual users against `url` for `duration` seconds; return the report."""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    rng = random.Random(seed)
+    results = Results()
+    users = [
+        VirtualUser(Connection(host, port), results, random.Random(rng.random()), customer, crew, menu, ordered)
+        for customer, crew, ordered in fixtures[:concurrency]
+    ]
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(*(user.run(mix or DEFAULT_MIX, deadline) for user in users))
+    return results.report(time.monotonic() - started)
@@ -0,0 +1,46 @@
+import time
+from dataclasses import fields
+
+from django.core.management.base import BaseCommand, CommandError
+
+from LittleLemonAPI import synthetic
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with synthetic users, menu, orders and carts for load testing.'
+
+    def add_arguments(self, parser):
+        defaults = synthetic.Volumes()
+        parser.add_argument('--customers', type=int, default=defaults.customers)
+        parser.add_argument('--managers', type=int, default=defaults.managers)
+        parser.add_argument('--crew', type=int, default=defaults.crew, help='Delivery crew members.')
+        parser.add_argument('--categories', type=int, default=defaults.categories)
+        parser.add_argument('--menu-items', type=int, default=defaults.menu_items)
+        parser.add_argument('--orders-per-customer', type=float, default=defaults.orders_per_customer,
+                            help='Average orders per customer.')
+        parser.add_argument('--items-per-order', type=float, default=defaults.items_per_order,
+                            help='Average order items per order.')
+        parser.add_argument('--cart-fraction', type=float, default=defaults.cart_fraction,
+                            help='Share of customers with an open cart.')
+        parser.add_argument('--unplaced-fraction', type=float, default=defaults.unplaced_fraction,
+                            help='Share of customers with order items waiting for a manager.')
+        parser.add_argument('--days', type=int, default=defaults.days, help='Spread order dates over this many days.')
+        parser.add_argument('--prefix', default='load-', help="Username prefix of the generated users (default 'load-').")
+        parser.add_argument('--password', default='lemon-load', help='Password of every generated user.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per insert transaction (default 5000).')
+        parser.add_argument('--seed', type=int, help='Seed for reproducible data.')
+
+    def handle(self, *args, **options):
+        volumes = synthetic.Volumes(**{field.name: options[field.name] for field in fields(synthetic.Volumes)})
+        started = time.perf_counter()
+        try:
+            counts = synthetic.generate(
+                volumes, prefix=options['prefix'], password=options['password'], batch_size=options['batch_size'],
+                seed=options['seed'], log=self.stdout.write,
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+        total = sum(counts.values())
+        for name, count in counts.items():
+            self.stdout.write(f'  {name}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {total} rows in {time.perf_counter() - started:.1f}s'))
@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from LittleLemonAPI import loadtest
+
+
+class Command(BaseCommand):
+    help = 'Replay a weighted mix of API calls against a running server and report throughput and latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server to test (default http://127.0.0.1:8000).')
+        parser.add_argument('--concurrency', type=int, default=20, help='Virtual users, one connection each (default 20).')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run (default 30).')
+        parser.add_argument('--mix', default=','.join(f'{name}={weight}' for name, weight in loadtest.DEFAULT_MIX.items()),
+                            help='Scenario weights (default %(default)s).')
+        parser.add_argument('--prefix', default='load-', help='Username prefix given to generate_synthetic_data.')
+        parser.add_argument('--seed', type=int, help='Seed for a reproducible sequence of calls.')
+        parser.add_argument('--json', dest='json_path', help='Also write the report to this JSON file.')
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options['mix'])
+            fixtures, menu = loadtest.load_fixtures(options['prefix'], options['concurrency'], options['seed'])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        self.stdout.write(f"{options['concurrency']} virtual users against {options['url']} for {options['duration']:g}s")
+        report = asyncio.run(loadtest.run(
+            options['url'], fixtures, menu, concurrency=options['concurrency'], duration=options['duration'],
+            mix=mix, seed=options['seed'],
+        ))
+
+        width = max([len(name) for name in report['endpoints']] + [8])
+        self.stdout.write(f"{'endpoint':<{width}}  {'requests':>8}  {'errors':>6}  {'4xx':>5}  "
+                          f"{'p50 ms':>8}  {'p90 ms':>8}  {'p99 ms':>8}  {'max ms':>8}")
+        for name, stats in report['endpoints'].items():
+            self.stdout.write(
+                f"{name:<{width}}  {stats['requests']:>8}  {stats['errors']:>6}  {stats['client_errors']:>5}  "
+                f"{stats['p50_ms']:>8.1f}  {stats['p90_ms']:>8.1f}  {stats['p99_ms']:>8.1f}  {stats['max_ms']:>8.1f}"
+            )
+        summary = (f"{report['requests']} requests in {report['duration_s']:.1f}s, "
+                   f"{report['throughput_rps']:.1f} req/s, {report['errors']} errors")
+        self.stdout.write(self.style.ERROR(summary) if report['errors'] else self.style.SUCCESS(summary))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as report_file:
+                json.dump(report, report_file, indent=2)
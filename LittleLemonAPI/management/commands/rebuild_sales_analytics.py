@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI import analytics
+from LittleLemonAPI.models import CategorySales, DailySales, MenuItemSales
+
+
+class Command(BaseCommand):
+    help = 'Recompute the sales summary tables from the order history.'
+
+    def handle(self, *args, **options):
+        analytics.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt sales analytics: {DailySales.objects.count()} days, '
+            f'{MenuItemSales.objects.count()} menu items, {CategorySales.objects.count()} categories'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI import inventory
+
+
+class Command(BaseCommand):
+    help = 'Return the inventory held by cart rows whose reservation has expired.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Cart rows released per transaction (default 500).')
+
+    def handle(self, *args, **options):
+        released = inventory.release_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired cart reservations'))
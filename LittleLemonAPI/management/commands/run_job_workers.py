@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the job table until interrupted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'JOB_WORKERS', 2),
+                            help='Jobs run at the same time (default JOB_WORKERS).')
+        parser.add_argument('--mode', choices=['thread', 'process'], default=getattr(settings, 'JOB_WORKER_MODE', 'thread'),
+                            help='Run jobs on threads or worker processes (default JOB_WORKER_MODE).')
+        parser.add_argument('--once', action='store_true',
+                            help='Run the jobs that are due in this process and exit.')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            ran = jobs.run_pending()
+            self.stdout.write(self.style.SUCCESS(f'Ran {ran} jobs'))
+            return
+
+        pool = jobs.WorkerPool(options['workers'], options['mode'], getattr(settings, 'JOB_POLL_SECONDS', 1.0))
+        pool.start()
+        self.stdout.write(f"Running jobs on {options['workers']} {options['mode']} workers, Ctrl-C to stop")
+        try:
+            pool.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Waiting for running jobs to finish...')
+            pool.stop()
@@ -0,0 +1,291 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+UNRESOLVED = '<unresolved>'
+
+
+class EndpointStats:
+    __slots__ = ('count', 'buckets', 'latency_sum', 'queries', 'sql_seconds', 'serialize_seconds', 'render_seconds')
+
+    def __init__(self, bucket_count):
+        self.count = 0
+        # Per-bucket (non-cumulative) counts plus one slot for +Inf
+        self.buckets = [0] * (bucket_count + 1)
+        self.latency_sum = 0.0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.render_seconds = 0.0
+
+
+class MetricsRegistry:
+    """
+    Per-endpoint request metrics, aggregated in process.
+
+    Recording a request is a dict lookup and a handful of additions under a
+    lock; histogram buckets are only made cumulative when the registry is
+    exported.
+    """
+
+    def __init__(self, latency_buckets=DEFAULT_LATENCY_BUCKETS):
+        self.latency_buckets = tuple(sorted(latency_buckets))
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, view, method, seconds, queries=0, sql_seconds=0.0, serialize_seconds=0.0, render_seconds=0.0):
+        bucket = bisect_left(self.latency_buckets, seconds)
+        with self._lock:
+            stats = self._stats.get((view, method))
+            if stats is None:
+                stats = self._stats[(view, method)] = EndpointStats(len(self.latency_buckets))
+            stats.count += 1
+            stats.buckets[bucket] += 1
+            stats.latency_sum += seconds
+            stats.queries += queries
+            stats.sql_seconds += sql_seconds
+            stats.serialize_seconds += serialize_seconds
+            stats.render_seconds += render_seconds
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self):
+        """Return {(view, method): dict} copied under the lock."""
+        with self._lock:
+            return {
+                key: {
+                    'count': stats.count,
+                    'buckets': list(stats.buckets),
+                    'latency_sum': stats.latency_sum,
+                    'queries': stats.queries,
+                    'sql_seconds': stats.sql_seconds,
+                    'serialize_seconds': stats.serialize_seconds,
+                    'render_seconds': stats.render_seconds,
+                }
+                for key, stats in self._stats.items()
+            }
+
+    def render_prometheus(self):
+        """Export the registry in the Prometheus text exposition format."""
+        snapshot = sorted(self.snapshot().items())
+        lines = []
+
+        def counter(name, help_text, field):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for (view, method), stats in snapshot:
+                lines.append(f'{name}{{{_labels(view, method)}}} {_number(stats[field])}')
+
+        counter('littlelemon_http_requests_total', 'Requests handled, by view and method.', 'count')
+
+        name = 'littlelemon_http_request_duration_seconds'
+        lines.append(f'# HELP {name} Time spent handling requests, by view and method.')
+        lines.append(f'# TYPE {name} histogram')
+        bounds = [_number(bound) for bound in self.latency_buckets] + ['+Inf']
+        for (view, method), stats in snapshot:
+            labels = _labels(view, method)
+            cumulative = 0
+            for bound, hits in zip(bounds, stats['buckets']):
+                cumulative += hits
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {_number(stats["latency_sum"])}')
+            lines.append(f'{name}_count{{{labels}}} {stats["count"]}')
+
+        counter('littlelemon_db_queries_total', 'SQL queries executed, by view and method.', 'queries')
+        counter('littlelemon_db_query_duration_seconds_total',
+                'Time spent executing SQL, by view and method.', 'sql_seconds')
+        counter('littlelemon_serializer_duration_seconds_total',
+                'Time serializers spent building response data, by view and method.', 'serialize_seconds')
+        counter('littlelemon_renderer_duration_seconds_total',
+                'Time DRF renderers spent encoding response data, by view and method.', 'render_seconds')
+        return '\n'.join(lines) + '\n'
+
+
+def render_cache_stats(caches):
+    """Export {name: LRUCache.stats()} in the Prometheus text exposition format."""
+    lines = []
+    for field, kind, help_text in (
+        ('entries', 'gauge', 'Entries held'),
+        ('max_entries', 'gauge', 'Entries the cache holds at most'),
+        ('hits', 'counter', 'Lookups served'),
+        ('misses', 'counter', 'Lookups that found nothing or an expired entry'),
+        ('evictions', 'counter', 'Entries dropped to make room'),
+    ):
+        name = f'littlelemon_cache_{field}' + ('_total' if kind == 'counter' else '')
+        lines.append(f'# HELP {name} {help_text}, by in-process cache.')
+        lines.append(f'# TYPE {name} {kind}')
+        for cache_name, stats in sorted(caches.items()):
+            lines.append(f'{name}{{cache="{_escape(cache_name)}"}} {stats[field]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _labels(view, method):
+    return f'view="{_escape(view)}",method="{_escape(method)}"'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry(getattr(settings, 'METRICS_LATENCY_BUCKETS', DEFAULT_LATENCY_BUCKETS))
+
+
+class QueryTimer:
+    """execute_wrapper that counts queries and the time spent in them."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+# The QueryTimer of the request being handled. Async views run their queries
+# in sync_to_async() threads, on those threads' own connections; a context
+# variable follows the request there where a per-connection wrapper cannot.
+_query_timer = ContextVar('littlelemon_query_timer', default=None)
+
+
+def time_queries(execute, sql, params, many, context):
+    timer = _query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_timer(connection):
+    """Add time_queries() to `connection`'s execute wrappers, once."""
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+class SerializationTimer:
+    """
+    Time spent in time_serialization() blocks, counting nested ones once.
+
+    Serializers given a queryset run its query themselves; SQL time the
+    request's QueryTimer records meanwhile is left out, so the two counters
+    do not overlap.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.running = False
+
+
+_serialization_timer = ContextVar('littlelemon_serialization_timer', default=None)
+
+
+@contextmanager
+def time_serialization():
+    """Count the block towards the current request's serialization time."""
+    timer = _serialization_timer.get()
+    if timer is None or timer.running:
+        yield
+        return
+    query_timer = _query_timer.get()
+    sql_seconds = query_timer.seconds if query_timer is not None else 0.0
+    timer.running = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if query_timer is not None:
+            sql_seconds = query_timer.seconds - sql_seconds
+        timer.seconds += time.perf_counter() - started - sql_seconds
+        timer.running = False
+
+
+class MetricsMiddleware:
+    """
+    Record latency, SQL, serialization and render time of every request in
+    `registry`.
+
+    Requests are labelled with the resolved URL name (or the view's dotted
+    path for unnamed routes). Serialization time is the time serializers
+    spend building response.data (see serializer.py). Render time is the
+    time DRF's renderers take to turn response.data into bytes. It is
+    measured from the end of process_template_response to the post-render
+    callback, so this middleware should come first in MIDDLEWARE to run its
+    hook last. Streaming responses are timed until their iterator is handed
+    back. Works in both sync and async middleware chains, so it does not
+    force async views through a thread under ASGI; new connections get the
+    query timer from the connection_created signal.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timers = QueryTimer(), SerializationTimer()
+        request._metrics_render_seconds = 0.0
+        started = time.perf_counter()
+        tokens = self._start(*timers)
+        try:
+            response = self.get_response(request)
+        finally:
+            self._stop(*tokens)
+        self._record(request, *timers, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        timers = QueryTimer(), SerializationTimer()
+        request._metrics_render_seconds = 0.0
+        started = time.perf_counter()
+        tokens = self._start(*timers)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._stop(*tokens)
+        self._record(request, *timers, time.perf_counter() - started)
+        return response
+
+    def _start(self, query_timer, serialization_timer):
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(connection)
+        return _query_timer.set(query_timer), _serialization_timer.set(serialization_timer)
+
+    def _stop(self, query_token, serialization_token):
+        _query_timer.reset(query_token)
+        _serialization_timer.reset(serialization_token)
+
+    def _record(self, request, query_timer, serialization_timer, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else UNRESOLVED
+        registry.record(view, request.method, elapsed, query_timer.queries, query_timer.seconds,
+                        serialization_timer.seconds, request._metrics_render_seconds)
+
+    def process_template_response(self, request, response):
+        started = time.perf_counter()
+
+        def rendered(response):
+            request._metrics_render_seconds += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,64 @@
+from django.db import migrations
+
+FTS_TABLE = 'LittleLemonAPI_menuitem_fts'
+MENU_ITEM_TABLE = 'LittleLemonAPI_menuitem'
+
+# External-content FTS5 index over MenuItem.title. The triggers keep it in
+# step with every write to the table, including bulk and raw SQL ones.
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE "{FTS_TABLE}" USING fts5(
+        title,
+        content='{MENU_ITEM_TABLE}',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER "{FTS_TABLE}_ai" AFTER INSERT ON "{MENU_ITEM_TABLE}" BEGIN
+        INSERT INTO "{FTS_TABLE}"(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    f"""
+    CREATE TRIGGER "{FTS_TABLE}_ad" AFTER DELETE ON "{MENU_ITEM_TABLE}" BEGIN
+        INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}", rowid, title) VALUES ('delete', old.id, old.title);
+    END
+    """,
+    f"""
+    CREATE TRIGGER "{FTS_TABLE}_au" AFTER UPDATE OF title ON "{MENU_ITEM_TABLE}" BEGIN
+        INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}", rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO "{FTS_TABLE}"(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    # Index the rows that already exist
+    f"""INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}") VALUES ('rebuild')""",
+]
+
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS "{FTS_TABLE}_ai"',
+    f'DROP TRIGGER IF EXISTS "{FTS_TABLE}_ad"',
+    f'DROP TRIGGER IF EXISTS "{FTS_TABLE}_au"',
+    f'DROP TABLE IF EXISTS "{FTS_TABLE}"',
+]
+
+
+def run_sql(statements):
+    def operation(apps, schema_editor):
+        # FTS5 is SQLite only; other backends keep using LIKE search
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0005_rename_delivery_crew_order_delivery_crew_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sql(CREATE_SQL), run_sql(DROP_SQL)),
+    ]
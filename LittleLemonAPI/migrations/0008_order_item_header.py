@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-18 08:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0007_sales_analytics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='header',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='items', to='LittleLemonAPI.order'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'date'], name='LittleLemon_user_id_65d2ad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['delivery_crew_user', 'status'], name='LittleLemon_deliver_496f59_idx'),
+        ),
+    ]
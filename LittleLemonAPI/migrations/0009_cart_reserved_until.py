@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0008_order_item_header'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='reserved_until',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from collections import defaultdict, deque
+
+from django.db import migrations
+
+
+def link_order_items(apps, schema_editor):
+    # Before 0008 an order was created from a single order item: same
+    # customer, total equal to that item's price. Give each order the
+    # oldest unlinked item that fits; items that fit no order were never
+    # ordered and stay pending.
+    Order = apps.get_model('LittleLemonAPI', 'Order')
+    OrderItem = apps.get_model('LittleLemonAPI', 'OrderItem')
+    candidates = defaultdict(deque)
+    for pk, customer, price in (
+        OrderItem.objects.filter(header__isnull=True).order_by('id').values_list('id', 'order_id', 'price')
+    ):
+        candidates[customer, price].append(pk)
+
+    linked = []
+    for pk, customer, total in Order.objects.filter(items__isnull=True).order_by('id').values_list('id', 'user_id', 'total'):
+        items = candidates.get((customer, total))
+        if items:
+            linked.append(OrderItem(id=items.popleft(), header_id=pk))
+    OrderItem.objects.bulk_update(linked, ['header'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0010_job_queue'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_order_items, migrations.RunPython.noop),
+    ]
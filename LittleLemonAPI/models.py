@@ -19,6 +19,9 @@ class Cart(models.Model):
     quantity = models.SmallIntegerField()
     unit_price = models.DecimalField(max_digits=6, decimal_places=2)
     price = models.DecimalField(max_digits=6, decimal_places=2)
+    # While set, `quantity` is held out of the item's inventory; cleared
+    # once the reservation has expired and been released (see inventory.py)
+    reserved_until = models.DateTimeField(null=True, blank=True, db_index=True)
 
     class Meta:
         unique_together = ('item','user')
@@ -29,6 +32,9 @@ class OrderItem(models.Model):
     quantity = models.SmallIntegerField()
     unit_price = models.DecimalField(max_digits=6, decimal_places=2)
     price = models.DecimalField(max_digits=6, decimal_places=2)
+    # `order` is the customer; `header` is the Order these items were placed
+    # under, null until a manager creates that order
+    header = models.ForeignKey('Order', on_delete=models.SET_NULL, related_name='items', null=True, blank=True)
 
     class Meta:
         unique_together = ('order','menuitem')
@@ -40,3 +46,58 @@ class Order(models.Model):
     total = models.DecimalField(max_digits=6, decimal_places=2)
     date = models.DateField(db_index=True)
 
+    class Meta:
+        indexes = [
+            # A customer's order history, newest first
+            models.Index(fields=['user', 'date']),
+            # A crew member's open or delivered orders
+            models.Index(fields=['delivery_crew_user', 'status']),
+        ]
+
+
+# Pre-aggregated sales figures, maintained incrementally by analytics.py.
+# Money is kept in integer cents so repeated increments stay exact on SQLite.
+class DailySales(models.Model):
+    date = models.DateField(unique=True)
+    orders = models.IntegerField(default=0)
+    revenue_cents = models.BigIntegerField(default=0)
+
+class MenuItemSales(models.Model):
+    menuitem = models.OneToOneField(MenuItem, on_delete=models.CASCADE, related_name='sales')
+    units = models.IntegerField(default=0, db_index=True)
+    revenue_cents = models.BigIntegerField(default=0)
+
+class CategorySales(models.Model):
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, related_name='sales')
+    units = models.IntegerField(default=0)
+    revenue_cents = models.BigIntegerField(default=0)
+
+
+# Background work queued by jobs.py. Rows outlive the process that queued
+# them, so pending work survives a restart.
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.SmallIntegerField(default=0)
+    max_attempts = models.SmallIntegerField(default=5)
+    # Not picked up before this time; pushed back on every retry
+    run_after = models.DateTimeField()
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Next due job: WHERE status = 'queued' ORDER BY run_after
+            models.Index(fields=['status', 'run_after']),
+        ]
@@ -0,0 +1,134 @@
+from datetime import date
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+from .search import RANK_FIELD
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination over an indexed column plus `id` as a tiebreaker.
+
+    DRF's CursorPagination only encodes the first ordering field and skips
+    duplicates with an offset, which gets slower as ties pile up. Here the
+    cursor carries both the column value and the id of the boundary row and
+    the next page is fetched with
+
+        WHERE col > value OR (col = value AND id > last_id)
+
+    so every page, however deep, is a single index range scan.
+    """
+    ordering = ('price', 'id')
+    page_size = getattr(settings, 'MENU_ITEMS_PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'MENU_ITEMS_MAX_PAGE_SIZE', 200)
+    # Checks the column value carried by a cursor; ValueError means a bad cursor
+    parse_value = staticmethod(float)
+
+    def get_ordering(self, request, queryset, view):
+        # OrderingFilter may hand us ('-price',) or several fields; only the
+        # leading one is used and `id` always follows it in the same direction.
+        field = super().get_ordering(request, queryset, view)[0]
+        # Full-text results page by relevance unless the client asked for an order
+        if RANK_FIELD in queryset.query.annotations and not request.query_params.get('ordering'):
+            field = RANK_FIELD
+        tiebreaker = '-id' if field.startswith('-') else 'id'
+        return (field, tiebreaker)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.set_page(list(page_queryset))
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Return the unevaluated queryset for the requested page.
+
+        Paging is split in two so async views can evaluate this queryset
+        with `async for` and then hand the rows to `set_page()`.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            self.reverse, self.position = False, None
+        else:
+            self.reverse, self.position = self.cursor.reverse, self.cursor.position
+
+        field, tiebreaker = self.ordering
+        if self.reverse:
+            queryset = queryset.order_by(_flip(field), _flip(tiebreaker))
+        else:
+            queryset = queryset.order_by(field, tiebreaker)
+
+        if self.position is not None:
+            value, last_id = self.decode_position(self.position)
+            # Ascending forwards and descending backwards both walk up the index
+            lookup = 'gt' if field.startswith('-') == self.reverse else 'lt'
+            name = field.lstrip('-')
+            queryset = queryset.filter(
+                Q(**{f'{name}__{lookup}': value})
+                | Q(**{name: value, f'id__{lookup}': last_id})
+            )
+
+        # Fetch one extra row to find out whether another page follows
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        self.page = results[:self.page_size]
+        has_following = len(results) > self.page_size
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.position is not None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        value = super()._get_position_from_instance(instance, ordering)
+        pk = instance['id'] if isinstance(instance, dict) else instance.id
+        return f'{value}|{pk}'
+
+    def decode_position(self, position):
+        try:
+            value, last_id = position.rsplit('|', 1)
+            self.parse_value(value)
+            return value, int(last_id)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+
+class OrderKeysetPagination(KeysetCursorPagination):
+    """Orders newest first, paged on (date, id)."""
+    ordering = ('-date', '-id')
+    page_size = getattr(settings, 'ORDERS_PAGE_SIZE', 50)
+    max_page_size = getattr(settings, 'ORDERS_MAX_PAGE_SIZE', 200)
+    parse_value = staticmethod(date.fromisoformat)
+
+
+def _flip(field):
+    return field[1:] if field.startswith('-') else '-' + field
@@ -0,0 +1,16 @@
+from rest_framework.permissions import BasePermission
+from .roles import MANAGER, DELIVERY_CREW, has_role
+
+
+class IsManager(BasePermission):
+    message = "Request denied, only Manager users allowed"
+
+    def has_permission(self, request, view):
+        return has_role(request.user, MANAGER)
+
+
+class IsDeliveryCrew(BasePermission):
+    message = "Only delivery crew users are allowed to perform this action."
+
+    def has_permission(self, request, view):
+        return has_role(request.user, DELIVERY_CREW)
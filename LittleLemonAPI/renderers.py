@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed.
+
+    Produces the same bytes as DRF's compact, unicode output. Anything orjson
+    does not handle natively (decimals, datetimes, lazy strings) goes through
+    DRF's JSONEncoder so values are formatted identically. Pretty-printed or
+    ASCII-only output falls back to the stock renderer.
+    """
+    if orjson is not None:
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_default, option=self.options)
+        # Keep the output a strict javascript subset, like JSONRenderer
+        if b'\xe2\x80' in ret:
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack, for clients that send Accept: application/msgpack."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+_encoder = JSONEncoder()
+
+
+def _default(value):
+    # Decimals, dates and other non-native types are encoded the way the
+    # JSON renderer would encode them
+    return _encoder.default(value)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON: one object per line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = [data]
+        return ''.join(self.stream(data)).encode(self.charset)
+
+    def stream(self, rows, chunk_rows=500):
+        encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        lines = []
+        for row in rows:
+            lines.append(encoder.encode(row) + '\n')
+            if len(lines) >= chunk_rows:
+                yield ''.join(lines)
+                lines = []
+        yield ''.join(lines)
+
+
+class CSVRenderer(BaseRenderer):
+    """Comma-separated values with a header row taken from the first row."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = [data]
+        return ''.join(self.stream(data)).encode(self.charset)
+
+    def stream(self, rows, header=None, chunk_size=64 * 1024):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if header is not None:
+            writer.writerow(header)
+        for row in rows:
+            if not isinstance(row, dict):
+                # Error bodies and other non-tabular data get a single column
+                row = {'value': row}
+            if header is None:
+                header = list(row)
+                writer.writerow(header)
+            writer.writerow([_csv_value(row.get(name)) for name in header])
+            if buffer.tell() >= chunk_size:
+                # Hand back what has been written so far and reuse the buffer
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=JSONEncoder)
+    return value
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.cache import cache
+
+MANAGER = 'Manager'
+DELIVERY_CREW = 'delivery-crew'
+
+ROLE_CACHE_TTL = getattr(settings, 'ROLE_CACHE_TTL', 60)
+
+
+def _cache_key(user_id):
+    return f'littlelemon:roles:{user_id}'
+
+
+def get_roles(user):
+    """
+    Return the names of the groups `user` belongs to.
+
+    The result is memoised on the user object, which lives for one request,
+    and in Django's cache for ROLE_CACHE_TTL seconds, so repeated role checks
+    cost at most one query per user per TTL. Membership changes made through
+    the ORM clear the cached entry (see signals.py).
+    """
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    try:
+        return user._littlelemon_roles
+    except AttributeError:
+        pass
+
+    key = _cache_key(user.pk)
+    roles = cache.get(key)
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        cache.set(key, roles, ROLE_CACHE_TTL)
+    user._littlelemon_roles = roles
+    return roles
+
+
+def has_role(user, role):
+    return role in get_roles(user)
+
+
+def invalidate_roles(*user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
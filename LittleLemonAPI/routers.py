@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA = 'replica'
+
+_use_replica = ContextVar('littlelemon_use_replica', default=False)
+
+
+@contextmanager
+def read_replica():
+    """Route ORM reads inside the block to the read-only connection."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReadReplicaRouter:
+    """
+    Send reads made inside `read_replica()` to the 'replica' alias.
+
+    With SQLite in WAL mode the replica is a second, read-only connection
+    to the same file, so it sees every committed write but never waits on a
+    writer. Reads inside a transaction on 'default' stay there, so they see
+    that transaction's own uncommitted changes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            _use_replica.get()
+            and REPLICA in settings.DATABASES
+            and not connections['default'].in_atomic_block
+        ):
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases point at the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReadReplicaMixin:
+    """Serve safe-method requests of a view from the read-only connection."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            with read_replica():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,59 @@
+import re
+
+from django.db import connections
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+from .models import MenuItem
+
+MENU_ITEM_TABLE = MenuItem._meta.db_table
+FTS_TABLE = f'{MENU_ITEM_TABLE}_fts'
+
+# Name of the annotation carrying the bm25 score; lower is a better match
+RANK_FIELD = 'search_rank'
+
+
+def build_match_query(terms):
+    """
+    Turn search terms into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix query and the words are implicitly
+    AND-ed, so "bru sal" matches "Bruschetta salad". Quoting keeps user input
+    from being parsed as FTS5 operators.
+    """
+    words = []
+    for term in terms:
+        words.extend(re.findall(r'\w+', term))
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Search MenuItem titles through the SQLite FTS5 index.
+
+    Matching rows are annotated with their bm25 rank and ordered by it, best
+    match first. On other database backends this falls back to
+    SearchFilter's LIKE queries over `search_fields`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if connections[queryset.db].vendor != 'sqlite':
+            return super().filter_queryset(request, queryset, view)
+
+        query = build_match_query(self.get_search_terms(request))
+        if not query:
+            return queryset
+
+        matches = RawSQL(f'SELECT rowid FROM "{FTS_TABLE}" WHERE "{FTS_TABLE}" MATCH %s', (query,))
+        rank = RawSQL(
+            f'SELECT bm25("{FTS_TABLE}") FROM "{FTS_TABLE}" '
+            f'WHERE "{FTS_TABLE}".rowid = "{MENU_ITEM_TABLE}"."id" AND "{FTS_TABLE}" MATCH %s',
+            (query,),
+            output_field=FloatField(),
+        )
+        return (
+            queryset.filter(id__in=matches)
+            .annotate(**{RANK_FIELD: rank})
+            .order_by(RANK_FIELD, 'id')
+        )
@@ -4,8 +4,37 @@ from rest_framework.validators import UniqueValidator
 from django.contrib.auth.models import User
 from djoser.serializers import UserCreateSerializer
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import cached_property
+from operator import itemgetter
+from .metrics import time_serialization
 
-class UserSerializer(serializers.ModelSerializer):
+
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with time_serialization():
+            return super().data
+
+
+class TimedModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer whose .data, single or many=True, counts as
+    serialization time in the request metrics (see metrics.py).
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        meta = getattr(cls, 'Meta', None)
+        if meta is not None and not hasattr(meta, 'list_serializer_class'):
+            meta.list_serializer_class = TimedListSerializer
+
+    @property
+    def data(self):
+        with time_serialization():
+            return super().data
+
+class UserSerializer(TimedModelSerializer):
     class Meta:
         model = User
         fields = '__all__'
@@ -20,12 +49,12 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         user = get_user_model().objects.create_user(**validated_data)
         return user
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedModelSerializer):
     class Meta:
         model = Category
         fields = ['id','title']
 
-class MenuItemSerializer(serializers.ModelSerializer):
+class MenuItemSerializer(TimedModelSerializer):
     category_id = serializers.IntegerField(write_only=True)
     category = CategorySerializer(read_only=True)
 
@@ -45,12 +74,28 @@ class MenuItemSerializer(serializers.ModelSerializer):
             'title': {'validators': [UniqueValidator(queryset=MenuItem.objects.all())]}
         }
         
-class CartSerializer(serializers.ModelSerializer):
+class MenuItemImportSerializer(serializers.Serializer):
+    # One row of a bulk menu import. Title uniqueness is checked for the
+    # whole batch at once, so unlike MenuItemSerializer there is no
+    # per-row UniqueValidator query.
+    title = serializers.CharField(max_length=255)
+    price = serializers.DecimalField(max_digits=6, decimal_places=2)
+    inventory = serializers.IntegerField(min_value=-32768, max_value=32767)
+    category_id = serializers.IntegerField()
+
+    validate = MenuItemSerializer.validate
+
+class CartSerializer(TimedModelSerializer):
     class Meta:
         model = Cart
         fields = ['id', 'user', 'item', 'quantity', 'unit_price', 'price']
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class CartEntrySerializer(serializers.Serializer):
+    # One entry of a batch add-to-cart request; the item is a MenuItem title
+    item = serializers.CharField(max_length=255)
+    quantity = serializers.IntegerField(min_value=1, max_value=32767, default=1)
+
+class OrderItemSerializer(TimedModelSerializer):
     menuitem_id = serializers.PrimaryKeyRelatedField(source='menuitem', queryset=MenuItem.objects.all())
 
     class Meta:
@@ -58,8 +103,116 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ['order', 'menuitem_id', 'quantity', 'unit_price', 'price']
 
 
-class DeliveryOrderSerializer(serializers.ModelSerializer):
+class DeliveryOrderSerializer(TimedModelSerializer):
 
     class Meta:
         model = Order
-        fields = ['id', 'delivery_crew_user', 'status', 'total', 'date', 'user']
\ No newline at end of file
+        fields = ['id', 'delivery_crew_user', 'status', 'total', 'date', 'user']
+
+
+class JobSerializer(TimedModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['id', 'name', 'status', 'attempts', 'result', 'error', 'created_at', 'started_at', 'finished_at']
+
+class CrewMemberSerializer(TimedModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username']
+
+class OrderLineSerializer(TimedModelSerializer):
+    menuitem = MenuItemSerializer(read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'menuitem', 'quantity', 'unit_price', 'price']
+
+class OrderDetailSerializer(TimedModelSerializer):
+    # Expects delivery_crew_user selected and items prefetched with their
+    # menu items and categories, see views.orders_for()
+    delivery_crew = CrewMemberSerializer(source='delivery_crew_user', read_only=True)
+    items = OrderLineSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'user', 'status', 'total', 'date', 'delivery_crew', 'items']
+
+
+class FastListSerializer:
+    """
+    Read-only, list-only twin of a ModelSerializer.
+
+    `rows(queryset)` fetches exactly the columns the serializer reads as
+    values() dicts (joining nested serializers in the same query) and
+    `to_representation(rows)` turns them into the same dicts the
+    ModelSerializer would produce, without model instances or a field tree
+    per row. The plan is compiled once from the serializer's readable
+    fields: one itemgetter per column and a converter only where DRF's
+    representation differs from the database value (decimals, dates).
+    """
+    # Fields whose representation is the raw database value
+    PASSTHROUGH_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.BooleanField, serializers.ReadOnlyField)
+
+    def __init__(self, serializer_class, prefix=''):
+        self.serializer_class = serializer_class
+        self.prefix = prefix
+
+    @cached_property
+    def plan(self):
+        plan = []
+        for field in self.serializer_class()._readable_fields:
+            lookup = self.prefix + field.source.replace('.', '__')
+            if isinstance(field, serializers.ModelSerializer):
+                nested = FastListSerializer(type(field), prefix=lookup + '__')
+                # A null foreign key shows up as a null primary key
+                plan.append((field.field_name, nested.prefix + 'id', nested))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+                # values() already returns the primary key of a relation
+                plan.append((field.field_name, lookup, None))
+            elif isinstance(field, self.PASSTHROUGH_FIELDS) and field.source != '*':
+                plan.append((field.field_name, lookup, None))
+            elif isinstance(field, (serializers.DecimalField, serializers.DateField, serializers.DateTimeField)):
+                plan.append((field.field_name, lookup, field.to_representation))
+            else:
+                raise ImproperlyConfigured(
+                    f'{self.serializer_class.__name__}.{field.field_name} has no fast path'
+                )
+        return [(name, itemgetter(lookup), lookup, convert) for name, lookup, convert in plan]
+
+    @cached_property
+    def lookups(self):
+        lookups = []
+        for _, _, lookup, convert in self.plan:
+            if isinstance(convert, FastListSerializer):
+                lookups.extend(convert.lookups)
+            else:
+                lookups.append(lookup)
+        return lookups
+
+    def rows(self, queryset):
+        """values() queryset with every column the plan reads plus annotations."""
+        return queryset.values(*self.lookups, *queryset.query.annotations)
+
+    def serialize(self, queryset):
+        return self.to_representation(self.rows(queryset))
+
+    def to_representation(self, rows):
+        with time_serialization():
+            return [self.represent(row) for row in rows]
+
+    def represent(self, row):
+        data = {}
+        for name, getter, _, convert in self.plan:
+            value = getter(row)
+            if value is None or convert is None:
+                data[name] = value
+            elif isinstance(convert, FastListSerializer):
+                data[name] = convert.represent(row)
+            else:
+                data[name] = convert(value)
+        return data
+
+
+menu_item_list_serializer = FastListSerializer(MenuItemSerializer)
+cart_list_serializer = FastListSerializer(CartSerializer)
+order_item_list_serializer = FastListSerializer(OrderItemSerializer)
@@ -0,0 +1,143 @@
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import Category, MenuItem, Order, OrderItem
+from .cache import bump_catalog_version
+from .roles import invalidate_roles
+from .authentication import revoke_tokens, forget_user
+from rest_framework.authtoken.models import Token
+from .dispatch import dispatcher
+from .metrics import install_query_timer
+from . import analytics
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_group_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    # `reverse` is True when the change went through group.user_set
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_roles(instance.pk)
+    elif action == 'pre_clear':
+        # pk_set is not provided for clear(), so remember who was in the group
+        instance._cleared_user_ids = list(instance.user_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        invalidate_roles(*getattr(instance, '_cleared_user_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_roles(*pk_set)
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        # The crew roster may have changed
+        dispatcher.reset()
+
+
+@receiver(post_delete, sender=Token)
+def revoke_deleted_token(sender, instance, **kwargs):
+    revoke_tokens(instance.key)
+
+
+@receiver(post_save, sender=User)
+def refresh_cached_user(sender, instance, created, **kwargs):
+    if created:
+        return
+    forget_user(instance.pk)
+    if not instance.is_active:
+        revoke_tokens(*Token.objects.filter(user=instance).values_list('key', flat=True))
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in connection.settings_dict.get('PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def time_connection_queries(sender, connection, **kwargs):
+    install_query_timer(connection)
+
+
+def _open_order_crew(order):
+    # The crew member an order counts against, if it is still open
+    return None if order.status else order.delivery_crew_user_id
+
+
+@receiver(post_init, sender=Order)
+def remember_dispatch_state(sender, instance, **kwargs):
+    instance._dispatch_crew = _open_order_crew(instance)
+
+
+@receiver(post_save, sender=Order)
+def update_dispatch_load(sender, instance, created, **kwargs):
+    old_crew = None if created else instance._dispatch_crew
+    new_crew = _open_order_crew(instance)
+    instance._dispatch_crew = new_crew
+    if old_crew == new_crew:
+        return
+
+    def apply():
+        if old_crew is not None:
+            dispatcher.adjust(old_crew, -1)
+        if new_crew is not None:
+            dispatcher.adjust(new_crew, 1)
+    transaction.on_commit(apply)
+
+
+@receiver(post_delete, sender=Order)
+def release_dispatch_load(sender, instance, **kwargs):
+    crew = _open_order_crew(instance)
+    if crew is not None:
+        transaction.on_commit(lambda: dispatcher.adjust(crew, -1))
+
+
+@receiver(post_init, sender=Order)
+def remember_order_sales(sender, instance, **kwargs):
+    instance._sales_snapshot = (instance.date, instance.total)
+
+
+@receiver(post_save, sender=Order)
+def update_daily_sales(sender, instance, created, **kwargs):
+    current = (instance.date, instance.total)
+    if created:
+        analytics.record_order(*current)
+    elif current != instance._sales_snapshot:
+        analytics.record_order(*instance._sales_snapshot, sign=-1)
+        analytics.record_order(*current)
+    instance._sales_snapshot = current
+
+
+@receiver(post_delete, sender=Order)
+def remove_daily_sales(sender, instance, **kwargs):
+    analytics.record_order(instance.date, instance.total, sign=-1)
+
+
+@receiver(post_init, sender=OrderItem)
+def remember_item_sales(sender, instance, **kwargs):
+    instance._sales_snapshot = (instance.menuitem_id, instance.quantity, instance.price)
+
+
+@receiver(post_save, sender=OrderItem)
+def update_item_sales(sender, instance, created, **kwargs):
+    current = (instance.menuitem_id, instance.quantity, instance.price)
+    if created:
+        analytics.record_order_items([current])
+    elif current != instance._sales_snapshot:
+        analytics.record_order_items([instance._sales_snapshot], sign=-1)
+        analytics.record_order_items([current])
+    instance._sales_snapshot = current
+
+
+@receiver(post_delete, sender=OrderItem)
+def remove_item_sales(sender, instance, **kwargs):
+    analytics.record_order_items([instance], sign=-1)
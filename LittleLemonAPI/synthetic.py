@@ -0,0 +1,227 @@
+"""
+Synthetic data for running the API at production scale locally.
+
+`generate()` adds managers, delivery crew and customers (all with API
+tokens), categories, menu items, an order history with its order items,
+order items still waiting for a manager and open carts. Rows are built as
+plain tuples of database values and written with executemany() in batches
+of `batch_size`, one transaction per batch, with primary keys assigned up
+front; model instances and bulk_create() would spend most of the time in
+per-field Python. Signals do not fire for these inserts, so the sales
+summaries, the catalog version and the dispatcher's load table are
+refreshed once at the end.
+
+The generated rows respect the same constraints as the API: one order
+item per customer and dish, one cart row per customer and dish, and carts
+only hold dishes their customer has not ordered yet, so they can be
+checked out. Money is generated in integer cents.
+"""
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from . import analytics
+from .cache import bump_catalog_version
+from .dispatch import dispatcher
+from .models import Cart, Category, MenuItem, Order, OrderItem
+from .roles import DELIVERY_CREW, MANAGER
+
+ADJECTIVES = (
+    'Lemon', 'Grilled', 'Roasted', 'Spiced', 'Smoked', 'Crispy', 'Braised', 'Herbed',
+    'Charred', 'Honeyed', 'Stuffed', 'Pickled', 'Garlic', 'Saffron', 'Minted', 'Seared',
+)
+DISHES = (
+    'Soup', 'Salad', 'Lamb', 'Chicken', 'Halloumi', 'Falafel', 'Risotto', 'Octopus',
+    'Tart', 'Bruschetta', 'Moussaka', 'Souvlaki', 'Couscous', 'Baklava', 'Gnocchi', 'Sea Bass',
+)
+CUISINES = ('Mediterranean', 'Greek', 'Italian', 'Turkish', 'Lebanese', 'Moroccan', 'Spanish', 'Levantine')
+
+
+@dataclass
+class Volumes:
+    customers: int = 1000
+    managers: int = 5
+    crew: int = 50
+    categories: int = 20
+    menu_items: int = 2000
+    orders_per_customer: float = 5
+    items_per_order: float = 3
+    cart_fraction: float = 0.3
+    unplaced_fraction: float = 0.05
+    days: int = 365
+
+
+def _first_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _count(rng, mean):
+    # Spread around `mean` without a long tail
+    return rng.randint(0, round(2 * mean))
+
+
+def _money(cents):
+    return f'{cents // 100}.{cents % 100:02d}'
+
+
+class Generator:
+
+    def __init__(self, volumes, prefix='load-', password='lemon-load', batch_size=5000, seed=None, log=None):
+        self.volumes = volumes
+        self.prefix = prefix
+        self.password = password
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.log = log or (lambda message: None)
+        self.counts = {}
+
+    def _insert(self, model, fields, rows):
+        """
+        Insert `rows`, tuples of database values for the model `fields`, in
+        batches; return how many were written.
+        """
+        columns = [model._meta.get_field(name).column for name in fields]
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(model._meta.db_table),
+            ', '.join(map(connection.ops.quote_name, columns)),
+            ', '.join(['%s'] * len(columns)),
+        )
+        written = 0
+        for batch in _batches(rows, self.batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+            written += len(batch)
+        name = model._meta.object_name
+        self.counts[name] = self.counts.get(name, 0) + written
+        return written
+
+    def _step(self, description, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        self.log(f'{description} in {time.perf_counter() - started:.1f}s')
+        return result
+
+    def run(self):
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise ValueError(f'Users named {self.prefix}* already exist; use another prefix')
+        volumes = self.volumes
+        self.now = connection.ops.adapt_datetimefield_value(timezone.now())
+        self.managers = self._step(f'{volumes.managers} managers', self._users, 'manager', volumes.managers, MANAGER)
+        self.crew = self._step(f'{volumes.crew} delivery crew', self._users, 'crew', volumes.crew, DELIVERY_CREW)
+        self.customers = self._step(f'{volumes.customers} customers', self._users, 'customer', volumes.customers)
+        self._step(f'{volumes.categories} categories and {volumes.menu_items} menu items', self._catalog)
+        self._step('Orders, order items and carts', self._orders)
+        self._step('Sales summaries', self._refresh)
+        return self.counts
+
+    def _refresh(self):
+        analytics.rebuild()
+        bump_catalog_version()
+        dispatcher.reset()
+
+    def _users(self, role, count, group_name=None):
+        first = _first_id(User)
+        ids = range(first, first + count)
+        # Hashing is slow by design, so every user shares one hash
+        password = make_password(self.password)
+        self._insert(
+            User, ('id', 'username', 'email', 'password', 'first_name', 'last_name',
+                   'is_staff', 'is_active', 'is_superuser', 'date_joined'),
+            ((pk, f'{self.prefix}{role}-{pk}', f'{self.prefix}{role}-{pk}@example.com', password, '', '',
+              False, True, False, self.now) for pk in ids),
+        )
+        self._insert(Token, ('key', 'user', 'created'), ((Token.generate_key(), pk, self.now) for pk in ids))
+        if group_name is not None:
+            group, _ = Group.objects.get_or_create(name=group_name)
+            self._insert(User.groups.through, ('user', 'group'), ((pk, group.pk) for pk in ids))
+        return ids
+
+    def _catalog(self):
+        rng = self.rng
+        first = _first_id(Category)
+        self.categories = range(first, first + self.volumes.categories)
+        self._insert(Category, ('id', 'slug', 'title'), (
+            (pk, f'{self.prefix}category-{pk}', f'{rng.choice(CUISINES)} {pk}') for pk in self.categories
+        ))
+
+        first = _first_id(MenuItem)
+        self.prices = {pk: rng.randint(200, 4000) for pk in range(first, first + self.volumes.menu_items)}
+        self.menu_items = list(self.prices)
+        self._insert(MenuItem, ('id', 'title', 'price', 'featured', 'inventory', 'category'), (
+            (pk, f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)} {pk}', _money(cents), rng.random() < 0.1,
+             rng.randint(1000, 30000), rng.choice(self.categories))
+            for pk, cents in self.prices.items()
+        ))
+
+    def _orders(self):
+        orders, order_items, carts = [], [], []
+        self.next_order_id = _first_id(Order)
+        self.next_order_item_id = _first_id(OrderItem)
+        self.dates = [(date.today() - timedelta(days=age)).isoformat() for age in range(self.volumes.days + 1)]
+        for customers in _batches(self.customers, max(1, self.batch_size // 20)):
+            for customer in customers:
+                self._customer(customer, orders, order_items, carts)
+            # Orders first: order items point at them
+            self._insert(Order, ('id', 'user', 'total', 'date', 'status', 'delivery_crew_user'), orders)
+            self._insert(OrderItem, ('id', 'order', 'menuitem', 'quantity', 'unit_price', 'price', 'header'), order_items)
+            self._insert(Cart, ('user', 'item', 'quantity', 'unit_price', 'price'), carts)
+            orders.clear()
+            order_items.clear()
+            carts.clear()
+
+    def _customer(self, customer, orders, order_items, carts):
+        rng = self.rng
+        volumes = self.volumes
+        prices = self.prices
+        order_sizes = [max(1, _count(rng, volumes.items_per_order)) for _ in range(_count(rng, volumes.orders_per_customer))]
+        unplaced = rng.randint(1, 3) if rng.random() < volumes.unplaced_fraction else 0
+        in_cart = rng.randint(1, 3) if rng.random() < volumes.cart_fraction else 0
+        wanted = min(sum(order_sizes) + unplaced + in_cart, len(self.menu_items))
+        # Every dish at most once per customer, across orders and cart
+        dishes = iter(rng.sample(self.menu_items, wanted))
+
+        def lines(count, header):
+            total = 0
+            for menuitem in islice(dishes, count):
+                quantity = rng.randint(1, 4)
+                price = prices[menuitem] * quantity
+                total += price
+                order_items.append((self.next_order_item_id, customer, menuitem, quantity,
+                                    _money(prices[menuitem]), _money(price), header))
+                self.next_order_item_id += 1
+            return total
+
+        for size in order_sizes:
+            order_id = self.next_order_id
+            self.next_order_id += 1
+            age = rng.randint(0, volumes.days)
+            total = lines(size, order_id)
+            if not total:
+                continue
+            crew = rng.choice(self.crew) if self.crew and rng.random() < 0.95 else None
+            # Older orders are mostly delivered; a few are still unassigned
+            orders.append((order_id, customer, _money(total), self.dates[age], rng.random() < min(1.0, age / 7), crew))
+        lines(unplaced, None)
+        for menuitem in dishes:
+            quantity = rng.randint(1, 3)
+            carts.append((customer, menuitem, quantity, _money(prices[menuitem]), _money(prices[menuitem] * quantity)))
+
+
+def generate(volumes, **options):
+    """Generate `volumes` of data; return {model name: rows written}."""
+    return Generator(volumes, **options).run()
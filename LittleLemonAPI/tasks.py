@@ -0,0 +1,47 @@
+"""Handlers for the background jobs queued through jobs.enqueue()."""
+import json
+from datetime import datetime, timedelta
+
+from .dispatch import dispatcher
+from .jobs import JobFailed, task
+from .models import OrderItem
+from .serializer import DeliveryOrderSerializer
+
+
+@task('finalize_order')
+def finalize_order(payload):
+    """
+    Create the Order for a customer's pending order items.
+
+    The order covers every item of the customer who owns
+    payload['order_item_id'] that is not part of an order yet, goes to the
+    delivery crew member with the fewest open orders and is due in a week.
+    Runs inside the job's transaction.
+    """
+    try:
+        order_item = OrderItem.objects.get(id=payload['order_item_id'])
+    except OrderItem.DoesNotExist:
+        raise JobFailed('OrderItem not found')
+    if order_item.header_id is not None:
+        raise JobFailed(f'OrderItem already belongs to order {order_item.header_id}')
+
+    delivery_crew_user_id = dispatcher.choose()
+    if delivery_crew_user_id is None:
+        raise JobFailed('No delivery crew available')
+
+    # Link exactly the rows that were summed
+    lines = list(
+        OrderItem.objects.filter(order_id=order_item.order_id, header__isnull=True).values_list('id', 'price')
+    )
+    serializer = DeliveryOrderSerializer(data={
+        'user': order_item.order_id,
+        'delivery_crew_user': delivery_crew_user_id,
+        'status': payload.get('status'),
+        'total': sum(price for _, price in lines),
+        'date': (datetime.now() + timedelta(weeks=1)).date(),
+    })
+    if not serializer.is_valid():
+        raise JobFailed(json.dumps(serializer.errors))
+    order = serializer.save()
+    OrderItem.objects.filter(id__in=[line_id for line_id, _ in lines]).update(header=order)
+    return serializer.data
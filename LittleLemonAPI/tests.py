@@ -1,3 +1,1514 @@
-from django.test import TestCase
+"""
+Tests for the LittleLemon API.
 
-# Create your tests here.
+EndpointBenchmarkTests exercises every route in LittleLemonAPI/urls.py
+through the Django test client as an anonymous visitor, a customer, a
+manager and a delivery crew member against a seeded catalog and order
+history. For each endpoint it records p50/p95 latency and the SQL query
+count, then fails when an endpoint goes over its declared query budget or
+latency budget, so N+1 regressions show up as test failures.
+
+The other classes each cover one mechanism: serializers and renderers,
+metrics, token and role caches, catalog caching, cursors and search,
+replica routing, dispatch, sales summaries, inventory reservations, the
+job queue, idempotency keys, conditional GETs, synthetic data and the
+load generator. Most of them build on CustomerTestCase. The throttle store
+and Django's cache live in a temporary directory for the whole run.
+
+Environment knobs:
+    BENCHMARK_ITERATIONS   requests per endpoint and role (default 10)
+    BENCHMARK_LATENCY_SCALE  multiplier applied to every p95 budget, for
+                           slow CI machines (default 1.0)
+    BENCHMARK_REPORT       write the measurements to this JSON file
+    BENCHMARK_BASELINE     compare p95 against a previous report and fail on
+                           regressions above BENCHMARK_TOLERANCE (default 0.5,
+                           i.e. 50% slower)
+    BENCHMARK_VERBOSE      print the measurement table
+"""
+import asyncio
+import base64
+import csv
+import gzip
+import importlib
+import io
+import json
+import math
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from rest_framework.authtoken.models import Token
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.exceptions import ParseError
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from . import analytics, idempotency, inventory, jobs, loadtest, synthetic, urls
+from .authentication import token_cache
+from .cache import STOCK_DEBOUNCE_KEY, catalog_cache, get_catalog_version
+from .compression import brotli
+from .dispatch import dispatcher
+from .metrics import UNRESOLVED, MetricsMiddleware, registry
+from .models import Cart, Category, CategorySales, DailySales, Job, MenuItem, MenuItemSales, Order, OrderItem
+from .parsers import CSVParser
+from .serializer import (CartSerializer, MenuItemSerializer, OrderItemSerializer, cart_list_serializer,
+                         menu_item_list_serializer, order_item_list_serializer)
+from .renderers import FastJSONRenderer, MessagePackRenderer, msgpack
+from .roles import DELIVERY_CREW, MANAGER, get_roles
+from .routers import REPLICA, ReadReplicaRouter, read_replica
+from .throttling import UserTokenBucketThrottle, bucket_store
+
+ITERATIONS = int(os.environ.get('BENCHMARK_ITERATIONS', 10))
+LATENCY_SCALE = float(os.environ.get('BENCHMARK_LATENCY_SCALE', 1.0))
+TOLERANCE = float(os.environ.get('BENCHMARK_TOLERANCE', 0.5))
+
+_scratch = tempfile.TemporaryDirectory()
+_scratch_settings = override_settings(
+    THROTTLE_STORE_PATH=os.path.join(_scratch.name, 'throttle.sqlite3'),
+    CACHES={'default': {**settings.CACHES['default'], 'LOCATION': os.path.join(_scratch.name, 'cache')}},
+)
+
+
+def setUpModule():
+    # Token buckets and cached versions from one run must not leak into the next
+    _scratch_settings.enable()
+
+
+def tearDownModule():
+    _scratch_settings.disable()
+    _scratch.cleanup()
+
+
+def run_in_workers(code, count=1):
+    """Run `code` in `count` separate Django processes sharing this run's cache directory."""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='API_project.settings',
+               LITTLELEMON_CACHE_DIR=str(settings.CACHES['default']['LOCATION']))
+    script = f'import django\ndjango.setup()\n{code}'
+    workers = [subprocess.Popen([sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env) for _ in range(count)]
+    return [worker.wait() for worker in workers]
+
+
+class CustomerTestCase(TestCase):
+    """
+    A customer with an API token and Lemon Soup (6.00, 5 in stock) in the
+    mains; every test starts with empty caches and throttle buckets.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer', password='lemon-customer')
+        cls.mains = Category.objects.create(slug='mains', title='Mains')
+        cls.soup = MenuItem.objects.create(title='Lemon Soup', price=Decimal('6.00'), inventory=5, category=cls.mains)
+        cls.token = Token.objects.create(user=cls.customer).key
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        catalog_cache.clear()
+        bucket_store.clear()
+
+    def stock(self, item):
+        item.refresh_from_db()
+        return item.inventory
+
+
+ROLES = ('anonymous', 'customer', 'manager', 'delivery-crew')
+
+Scenario = namedtuple('Scenario', 'name route method path data')
+
+# Maximum SQL queries for a single request (worst role, cold caches) and
+# p95 latency in milliseconds. Raise a budget only together with the change
+# that justifies it.
+BUDGETS = {
+    'menu-items list': {'queries': 4, 'p95_ms': 150},
+    'menu-items search': {'queries': 4, 'p95_ms': 150},
+    'menu-items by price desc': {'queries': 4, 'p95_ms': 150},
+    'menu-items create': {'queries': 6, 'p95_ms': 150},
+    'menu-items import': {'queries': 8, 'p95_ms': 250},
+    'menu-item detail': {'queries': 4, 'p95_ms': 100},
+    'menu-item update': {'queries': 7, 'p95_ms': 150},
+    'categories list': {'queries': 3, 'p95_ms': 100},
+    'categories create': {'queries': 5, 'p95_ms': 100},
+    'group members list': {'queries': 4, 'p95_ms': 100},
+    'group members add': {'queries': 6, 'p95_ms': 100},
+    'group member remove': {'queries': 7, 'p95_ms': 100},
+    'cart list': {'queries': 3, 'p95_ms': 100},
+    'cart add': {'queries': 10, 'p95_ms': 100},
+    'cart add batch': {'queries': 9, 'p95_ms': 150},
+    'cart empty': {'queries': 5, 'p95_ms': 100},
+    'order list': {'queries': 4, 'p95_ms': 250},
+    'order export csv': {'queries': 4, 'p95_ms': 250},
+    'order checkout': {'queries': 12, 'p95_ms': 150},
+    'order item detail': {'queries': 3, 'p95_ms': 100},
+    'order create': {'queries': 5, 'p95_ms': 150},
+    'order status update': {'queries': 5, 'p95_ms': 100},
+    'order dispatch': {'queries': 6, 'p95_ms': 150},
+    'orders list': {'queries': 6, 'p95_ms': 250},
+    'order with items': {'queries': 6, 'p95_ms': 100},
+    'job status': {'queries': 4, 'p95_ms': 100},
+    'sales analytics': {'queries': 5, 'p95_ms': 100},
+    'metrics': {'queries': 3, 'p95_ms': 100},
+    'async menu-items list': {'queries': 4, 'p95_ms': 150},
+    'async menu-item detail': {'queries': 3, 'p95_ms': 100},
+    'async categories list': {'queries': 3, 'p95_ms': 100},
+}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@override_settings(
+    REST_FRAMEWORK={
+        'DEFAULT_AUTHENTICATION_CLASSES': (
+            'LittleLemonAPI.authentication.CachedTokenAuthentication',
+        ),
+        # The suite fires far more requests than any real client may
+        'DEFAULT_THROTTLE_RATES': {'anon': None, 'user': None},
+    },
+)
+class EndpointBenchmarkTests(TestCase):
+    """Latency and query-count budgets for every API endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(2024)
+        cache.clear()
+
+        manager_group = Group.objects.create(name=MANAGER)
+        crew_group = Group.objects.create(name=DELIVERY_CREW)
+
+        cls.manager = User.objects.create_user('manager', password='lemon-manager')
+        manager_group.user_set.add(cls.manager)
+        cls.crew = [User.objects.create_user(f'crew{i}', password='lemon-crew') for i in range(3)]
+        crew_group.user_set.add(*cls.crew)
+        customers = [User.objects.create_user(f'customer{i}', password='lemon-customer') for i in range(40)]
+        cls.customer = customers[0]
+
+        categories = Category.objects.bulk_create(
+            Category(slug=slug, title=slug.title())
+            for slug in ('appetizers', 'salads', 'mains', 'pasta', 'desserts', 'drinks')
+        )
+        words = ('Lemon', 'Greek', 'Grilled', 'Roasted', 'Spicy', 'Garden', 'Salmon', 'Chicken',
+                 'Bruschetta', 'Salad', 'Pasta', 'Soup', 'Cake', 'Tart', 'Fries', 'Risotto')
+        cls.menu_items = MenuItem.objects.bulk_create(
+            MenuItem(
+                title=f'{rng.choice(words)} {rng.choice(words)} {index}',
+                price=Decimal(rng.randrange(200, 4000)) / 100,
+                inventory=rng.randrange(20, 200),
+                featured=rng.random() < 0.1,
+                category=rng.choice(categories),
+            )
+            for index in range(300)
+        )
+
+        # Order history and open carts; cart items never overlap a customer's
+        # ordered items so checkout does not trip the unique constraint
+        order_items, carts, orders = [], [], []
+        today = date.today()
+        for customer in customers:
+            picks = rng.sample(cls.menu_items, 13)
+            for item in picks[:8]:
+                quantity = rng.randrange(1, 4)
+                order_items.append(OrderItem(order=customer, menuitem=item, quantity=quantity,
+                                             unit_price=item.price, price=item.price * quantity))
+            for position, item in enumerate(picks[8:]):
+                quantity = rng.randrange(1, 4)
+                # Some rows still hold their stock, the others were released
+                reserved_until = timezone.now() + timedelta(days=1) if position % 2 else None
+                carts.append(Cart(user=customer, item=item, quantity=quantity, reserved_until=reserved_until,
+                                  unit_price=item.price, price=item.price * quantity))
+            for days_ago in range(3):
+                orders.append(Order(user=customer, delivery_crew_user=rng.choice(cls.crew),
+                                    status=rng.random() < 0.5, total=Decimal('42.50'),
+                                    date=today - timedelta(days=days_ago)))
+        OrderItem.objects.bulk_create(order_items)
+        Cart.objects.bulk_create(carts)
+        Order.objects.bulk_create(orders)
+        Order.objects.bulk_create(
+            Order(user=customer, status=False, total=Decimal('10.00'), date=today) for customer in customers[:5]
+        )
+        # Group each customer's order items under their latest order, except
+        # for one customer whose items are still waiting for an order
+        for customer in customers[2:] + customers[:1]:
+            order = Order.objects.filter(user=customer).latest('date')
+            OrderItem.objects.filter(order=customer).update(header=order)
+        cls.order = Order.objects.filter(user=customers[0]).latest('date')
+        cls.order.delivery_crew_user = cls.crew[0]
+        cls.order.save()
+        analytics.rebuild()
+
+        cls.tokens = {
+            'customer': Token.objects.create(user=cls.customer).key,
+            'manager': Token.objects.create(user=cls.manager).key,
+            'delivery-crew': Token.objects.create(user=cls.crew[0]).key,
+        }
+        cls.order_item = OrderItem.objects.filter(order=cls.customer).first()
+        cls.outsider = customers[-1]
+        cls.unplaced_item = OrderItem.objects.filter(order=customers[1]).first()
+        cls.job = Job.objects.create(name='finalize_order', payload={'order_item_id': cls.unplaced_item.pk},
+                                     run_after=timezone.now(), created_by=cls.customer)
+        # Nobody has this dish in their cart yet, so every role can add it
+        cls.uncarted_item = MenuItem.objects.exclude(cart__isnull=False).order_by('id').first()
+
+    def setUp(self):
+        # Every measurement starts from cold in-process caches
+        cache.clear()
+        catalog_cache.clear()
+        token_cache.clear()
+        bucket_store.clear()
+        dispatcher.reset()
+
+    def scenarios(self):
+        item = self.menu_items[0]
+        cart_titles = [menu_item.title for menu_item in self.menu_items[100:110]]
+        return [
+            Scenario('menu-items list', 'menu-items/', 'get', '/api/menu-items/', None),
+            Scenario('menu-items search', 'menu-items/', 'get', '/api/menu-items/?search=gril sal', None),
+            Scenario('menu-items by price desc', 'menu-items/', 'get', '/api/menu-items/?ordering=-price&page_size=100', None),
+            Scenario('menu-items create', 'menu-items/', 'post', '/api/menu-items/',
+                     {'title': 'Benchmark Special', 'price': '9.50', 'inventory': 5, 'category_id': item.category_id}),
+            Scenario('menu-items import', 'menu-items/import/', 'post', '/api/menu-items/import/',
+                     [{'title': menu_item.title, 'price': '15.00', 'inventory': 3, 'category_id': menu_item.category_id}
+                      for menu_item in self.menu_items[:100]]
+                     + [{'title': f'Seasonal {index}', 'price': '8.25', 'inventory': 10, 'category_id': item.category_id}
+                        for index in range(100)]),
+            Scenario('menu-item detail', 'menu-items/<int:pk>/', 'get', f'/api/menu-items/{item.pk}/', None),
+            Scenario('menu-item update', 'menu-items/<int:pk>/', 'patch', f'/api/menu-items/{item.pk}/',
+                     {'title': item.title, 'price': '12.00', 'inventory': 7}),
+            Scenario('categories list', 'categories/', 'get', '/api/categories/', None),
+            Scenario('categories create', 'categories/', 'post', '/api/categories/', {'slug': 'specials', 'title': 'Specials'}),
+            Scenario('group members list', 'groups/<str:group_name>/users', 'get', f'/api/groups/{DELIVERY_CREW}/users', None),
+            Scenario('group members add', 'groups/<str:group_name>/users', 'post', f'/api/groups/{DELIVERY_CREW}/users',
+                     {'username': self.outsider.username}),
+            Scenario('group member remove', 'groups/<str:group_name>/users/<int:user_id>/', 'delete',
+                     f'/api/groups/{DELIVERY_CREW}/users/{self.crew[1].pk}/', None),
+            Scenario('cart list', 'cart/menu-items/', 'get', '/api/cart/menu-items/', None),
+            Scenario('cart add', 'cart/menu-items/', 'post', '/api/cart/menu-items/',
+                     {'item': self.uncarted_item.title, 'quantity': 2}),
+            Scenario('cart add batch', 'cart/menu-items/', 'post', '/api/cart/menu-items/',
+                     [{'item': title, 'quantity': 1} for title in cart_titles]),
+            Scenario('cart empty', 'cart/menu-items/', 'delete', '/api/cart/menu-items/', None),
+            Scenario('order list', 'order/', 'get', '/api/order/', None),
+            Scenario('order export csv', 'order/', 'get', '/api/order/?format=csv', None),
+            Scenario('order checkout', 'order/', 'post', '/api/order/', None),
+            Scenario('order item detail', 'order/<int:orderId>/', 'get', f'/api/order/{self.order_item.pk}/', None),
+            Scenario('order create', 'order/<int:orderId>/', 'post', f'/api/order/{self.unplaced_item.pk}/', {'status': 0}),
+            Scenario('order status update', 'order/<int:orderId>/', 'patch', f'/api/order/{self.order_item.pk}/', {'status': 1}),
+            Scenario('order dispatch', 'order/dispatch/', 'post', '/api/order/dispatch/', None),
+            Scenario('orders list', 'orders/', 'get', '/api/orders/', None),
+            Scenario('order with items', 'orders/<int:pk>/', 'get', f'/api/orders/{self.order.pk}/', None),
+            Scenario('job status', 'jobs/<int:pk>/', 'get', f'/api/jobs/{self.job.pk}/', None),
+            Scenario('sales analytics', 'analytics/sales/', 'get', '/api/analytics/sales/', None),
+            Scenario('metrics', 'metrics/', 'get', '/api/metrics/', None),
+            Scenario('async menu-items list', 'async/menu-items/', 'get', '/api/async/menu-items/?search=lemon', None),
+            Scenario('async menu-item detail', 'async/menu-items/<int:pk>/', 'get', f'/api/async/menu-items/{item.pk}/', None),
+            Scenario('async categories list', 'async/categories/', 'get', '/api/async/categories/', None),
+        ]
+
+    def request(self, scenario, role):
+        headers = {}
+        if role != 'anonymous':
+            headers['HTTP_AUTHORIZATION'] = f'Token {self.tokens[role]}'
+        data = scenario.data
+        if data is not None:
+            data = json.dumps(data)
+        method = getattr(self.client, scenario.method)
+        return method(scenario.path, data=data, content_type='application/json', **headers)
+
+    def measure(self, scenario):
+        result = {'queries': 0, 'latencies_ms': [], 'statuses': {}}
+        for role in ROLES:
+            for _ in range(ITERATIONS):
+                # Roll back every request so writes do not pile up between
+                # iterations and each one sees the same data
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        response = self.request(scenario, role)
+                        if response.streaming:
+                            b''.join(response.streaming_content)
+                        elapsed = (time.perf_counter() - started) * 1000
+                    transaction.set_rollback(True)
+
+                self.assertLess(
+                    response.status_code, 500,
+                    f'{scenario.name} as {role} failed with {response.status_code}',
+                )
+                result['queries'] = max(result['queries'], len(queries))
+                result['latencies_ms'].append(elapsed)
+                result['statuses'].setdefault(role, response.status_code)
+        result['p50_ms'] = statistics.median(result['latencies_ms'])
+        result['p95_ms'] = percentile(result['latencies_ms'], 0.95)
+        return result
+
+    def test_every_route_is_benchmarked(self):
+        routes = {str(pattern.pattern) for pattern in urls.urlpatterns}
+        covered = {scenario.route for scenario in self.scenarios()}
+        self.assertEqual(routes - covered, set(), 'Add a Scenario and a budget for every new route')
+        self.assertEqual({scenario.name for scenario in self.scenarios()}, set(BUDGETS))
+
+    def test_endpoint_budgets(self):
+        results = {}
+        for scenario in self.scenarios():
+            results[scenario.name] = self.measure(scenario)
+
+        baseline = {}
+        if os.environ.get('BENCHMARK_BASELINE'):
+            with open(os.environ['BENCHMARK_BASELINE']) as baseline_file:
+                baseline = json.load(baseline_file)
+        if os.environ.get('BENCHMARK_REPORT'):
+            with open(os.environ['BENCHMARK_REPORT'], 'w') as report_file:
+                json.dump({name: {key: value for key, value in result.items() if key != 'latencies_ms'}
+                           for name, result in results.items()}, report_file, indent=2, sort_keys=True)
+        if os.environ.get('BENCHMARK_VERBOSE'):
+            print(f'\n{"endpoint":<28}{"queries":>8}{"p50 ms":>9}{"p95 ms":>9}  statuses')
+            for name, result in results.items():
+                print(f'{name:<28}{result["queries"]:>8}{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}  {result["statuses"]}')
+
+        for name, result in results.items():
+            budget = BUDGETS[name]
+            with self.subTest(endpoint=name):
+                self.assertLessEqual(result['queries'], budget['queries'],
+                                     f'{name} ran {result["queries"]} queries, budget is {budget["queries"]}')
+                self.assertLessEqual(result['p95_ms'], budget['p95_ms'] * LATENCY_SCALE,
+                                     f'{name} p95 is {result["p95_ms"]:.1f}ms, budget is {budget["p95_ms"]}ms')
+                if name in baseline:
+                    limit = baseline[name]['p95_ms'] * (1 + TOLERANCE)
+                    self.assertLessEqual(result['p95_ms'], limit,
+                                         f'{name} p95 regressed to {result["p95_ms"]:.1f}ms from {baseline[name]["p95_ms"]:.1f}ms')
+
+
+class FastListSerializerTests(TestCase):
+    """The values() fast path must render exactly what the serializers do."""
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = User.objects.create_user('customer', password='lemon-customer')
+        category = Category.objects.create(slug='mains', title='Mains')
+        items = MenuItem.objects.bulk_create(
+            MenuItem(title=f'Dish {index}', price=Decimal('2.5') + index, inventory=index, category=category)
+            for index in range(5)
+        )
+        Cart.objects.bulk_create(
+            Cart(user=customer, item=item, quantity=2, unit_price=item.price, price=item.price * 2) for item in items[:3]
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=customer, menuitem=item, quantity=1, unit_price=item.price, price=item.price) for item in items[2:]
+        )
+
+    def assertSameOutput(self, serializer_class, fast_serializer, queryset):
+        expected = json.loads(json.dumps(serializer_class(queryset, many=True).data))
+        self.assertEqual(json.loads(json.dumps(fast_serializer.serialize(queryset))), expected)
+
+    def test_menu_items(self):
+        self.assertSameOutput(MenuItemSerializer, menu_item_list_serializer,
+                              MenuItem.objects.select_related('category').order_by('id'))
+
+    def test_cart(self):
+        self.assertSameOutput(CartSerializer, cart_list_serializer, Cart.objects.order_by('id'))
+
+    def test_order_items(self):
+        self.assertSameOutput(OrderItemSerializer, order_item_list_serializer, OrderItem.objects.order_by('id'))
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            menu_item_list_serializer.serialize(MenuItem.objects.all())
+
+
+@override_settings(
+    REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'anon': None, 'user': None}},
+    RESPONSE_COMPRESSION_MIN_BYTES=1024,
+)
+class PayloadBenchmarkTests(TestCase):
+    """Render time per renderer and bytes saved by compression on large payloads."""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(2024)
+        cls.customer = User.objects.create_user('customer', password='lemon-customer')
+        categories = Category.objects.bulk_create(
+            Category(slug=slug, title=slug.title()) for slug in ('mains', 'desserts', 'drinks')
+        )
+        items = MenuItem.objects.bulk_create(
+            MenuItem(title=f'Lemon Dish {index}', price=Decimal(rng.randrange(200, 4000)) / 100,
+                     inventory=rng.randrange(0, 200), category=rng.choice(categories))
+            for index in range(300)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=cls.customer, menuitem=item, quantity=2, unit_price=item.price, price=item.price * 2)
+            for item in items[:200]
+        )
+        cls.token = Token.objects.create(user=cls.customer).key
+
+    def setUp(self):
+        catalog_cache.clear()
+
+    def payloads(self):
+        return {
+            'menu page (200)': {'results': menu_item_list_serializer.serialize(MenuItem.objects.order_by('price', 'id')[:200])},
+            'order items (200)': order_item_list_serializer.serialize(OrderItem.objects.order_by('id')),
+        }
+
+    def render_time_ms(self, renderer, data):
+        samples = []
+        for _ in range(ITERATIONS):
+            started = time.perf_counter()
+            renderer.render(data)
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
+
+    def test_renderers(self):
+        renderers = {'json': JSONRenderer(), 'fast json': FastJSONRenderer()}
+        if msgpack is not None:
+            renderers['msgpack'] = MessagePackRenderer()
+
+        report = []
+        for name, data in self.payloads().items():
+            expected = JSONRenderer().render(data)
+            self.assertEqual(FastJSONRenderer().render(data), expected)
+            for renderer_name, renderer in renderers.items():
+                body = renderer.render(data)
+                report.append((name, renderer_name, len(body), self.render_time_ms(renderer, data)))
+
+        if os.environ.get('BENCHMARK_VERBOSE'):
+            print(f'\n{"payload":<20}{"renderer":<12}{"bytes":>9}{"render ms":>11}')
+            for name, renderer_name, size, elapsed in report:
+                print(f'{name:<20}{renderer_name:<12}{size:>9}{elapsed:>11.2f}')
+
+    def test_compression(self):
+        headers = {'HTTP_AUTHORIZATION': f'Token {self.token}'}
+        encodings = ['gzip'] + (['br'] if brotli is not None else [])
+        report = []
+        for path in ('/api/menu-items/?page_size=200', '/api/order/', '/api/cart/menu-items/'):
+            plain = self.client.get(path, **headers)
+            self.assertFalse(plain.has_header('Content-Encoding'))
+            for encoding in encodings:
+                response = self.client.get(path, HTTP_ACCEPT_ENCODING=encoding, **headers)
+                if len(plain.content) < 1024:
+                    # The cart is empty; small bodies are sent as they are
+                    self.assertFalse(response.has_header('Content-Encoding'))
+                    continue
+                self.assertIn('Accept-Encoding', response['Vary'])
+                self.assertEqual(response['Content-Encoding'], encoding)
+                decompress = gzip.decompress if encoding == 'gzip' else brotli.decompress
+                self.assertEqual(decompress(response.content), plain.content)
+                report.append((path, encoding, len(plain.content), len(response.content)))
+
+        if os.environ.get('BENCHMARK_VERBOSE'):
+            print(f'\n{"path":<34}{"encoding":<10}{"bytes":>9}{"sent":>9}{"saved":>8}')
+            for path, encoding, size, sent in report:
+                print(f'{path:<34}{encoding:<10}{size:>9}{sent:>9}{1 - sent / size:>8.0%}')
+
+
+
+class CachedTokenAuthenticationTests(CustomerTestCase):
+    """Cached tokens stop working as soon as the token or its user changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = User.objects.create_user('other', password='lemon-other')
+        cls.other_key = Token.objects.create(user=cls.other).key
+
+    def me(self, key=None):
+        return self.client.get('/api/users/me/', HTTP_AUTHORIZATION=f'Token {key or self.token}')
+
+    def test_tokens_are_cached(self):
+        self.assertEqual(self.me().status_code, 200)
+        hits = token_cache.hits
+        self.assertEqual(self.me().json()['username'], 'customer')
+        self.assertEqual(token_cache.hits, hits + 1)
+
+    def test_logout(self):
+        self.me()
+        self.client.post('/api/token/logout/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_token_deletion(self):
+        self.me()
+        Token.objects.filter(key=self.token).delete()
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_deactivation(self):
+        self.me()
+        self.customer.is_active = False
+        self.customer.save()
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_user_save(self):
+        self.me()
+        self.me(self.other_key)
+        self.customer.set_password('lemon-changed')
+        self.customer.save()
+        # Only the saved user's tokens are dropped
+        self.assertEqual(len(token_cache), 1)
+        self.assertEqual(self.me().status_code, 200)
+        self.assertTrue(token_cache.get(self.token)[0].check_password('lemon-changed'))
+
+    def test_tombstone_overrides_other_workers_copies(self):
+        self.me()
+        stale = token_cache.get(self.token)
+        Token.objects.filter(key=self.token).delete()
+        # Another worker still holds the token in its own cache
+        token_cache.set(self.token, stale)
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_revocation_reaches_other_processes(self):
+        self.assertEqual(self.me().status_code, 200)
+        # Another worker deletes the token: the row goes, but this process gets no signal
+        Token.objects.filter(key=self.token)._raw_delete('default')
+        self.assertEqual(self.me().status_code, 200)
+        code = f'from LittleLemonAPI.authentication import revoke_tokens\nrevoke_tokens({self.token!r})'
+        self.assertEqual(run_in_workers(code), [0])
+        self.assertEqual(self.me().status_code, 401)
+
+
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'anon': '60/minute', 'user': '3/minute'}})
+class ThrottleTests(CustomerTestCase):
+    """Every endpoint takes from a shared token bucket, and a contended store never lifts the limit."""
+
+    def request(self, method, path):
+        return getattr(self.client, method)(path, HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def assertThrottled(self, method, path):
+        for _ in range(3):
+            self.assertNotEqual(self.request(method, path).status_code, 429)
+        response = self.request(method, path)
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(response.has_header('Retry-After'))
+
+    def test_cart(self):
+        self.assertThrottled('get', '/api/cart/menu-items/')
+
+    def test_remove_user_from_group(self):
+        Group.objects.create(name=MANAGER).user_set.add(self.customer)
+        self.assertThrottled('delete', f'/api/groups/{MANAGER}/users/0/')
+
+    def test_locked_store_refuses(self):
+        blocker = sqlite3.connect(bucket_store.path, isolation_level=None)
+        self.addCleanup(blocker.close)
+        blocker.execute('BEGIN IMMEDIATE')
+        self.assertEqual(self.request('get', '/api/cart/menu-items/').status_code, 429)
+        blocker.execute('ROLLBACK')
+        self.assertEqual(self.request('get', '/api/cart/menu-items/').status_code, 200)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'user': '60/minute'}})
+    def test_contention_keeps_the_limit(self):
+        request = namedtuple('Request', 'user')(self.customer)
+        allowed = []
+
+        def consume():
+            throttle = UserTokenBucketThrottle()
+            allowed.extend(throttle.allow_request(request, None) for _ in range(50))
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=consume) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # One token a second refills while the threads run
+        self.assertLessEqual(sum(allowed), 60 + math.ceil(time.monotonic() - started))
+
+
+class MetricsMiddlewareTests(TestCase):
+
+    def setUp(self):
+        registry.reset()
+
+    def test_async_chain(self):
+        async def get_response(request):
+            await sync_to_async(list)(MenuItem.objects.all())
+            return HttpResponse()
+
+        middleware = MetricsMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get('/api/menu-items/')
+        asyncio.run(middleware(request))
+        [((view, method), stats)] = registry.snapshot().items()
+        self.assertEqual((view, method, stats['count'], stats['queries']), (UNRESOLVED, 'GET', 1, 1))
+
+    def test_serialization_is_timed_apart(self):
+        category = Category.objects.create(slug='mains', title='Mains')
+        MenuItem.objects.bulk_create(MenuItem(title=f'Dish {index}', price=Decimal('6.00'), inventory=5, category=category)
+                                     for index in range(50))
+        token = Token.objects.create(user=User.objects.create_user('customer', password='lemon-customer')).key
+        cache.clear()
+        catalog_cache.clear()
+        for path in ('/api/menu-items/', '/api/categories/'):
+            self.assertEqual(self.client.get(path, HTTP_AUTHORIZATION=f'Token {token}').status_code, 200)
+        for (view, method), stats in registry.snapshot().items():
+            # Both paths serialize, but their queries are not counted twice
+            self.assertGreater(stats['serialize_seconds'], 0, view)
+            self.assertLess(stats['serialize_seconds'] + stats['sql_seconds'], stats['latency_sum'], view)
+        self.assertIn('# TYPE littlelemon_serializer_duration_seconds_total counter', registry.render_prometheus())
+
+
+@override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'anon': None, 'user': None}})
+class CatalogTests(TestCase):
+    """Catalog cache, keyset cursors and full-text search on /api/menu-items/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', password='lemon-manager')
+        Group.objects.create(name=MANAGER).user_set.add(cls.manager)
+        category = Category.objects.create(slug='mains', title='Mains')
+        titles = ['Lemon', 'Lemon Grilled Spiced Smoked Crispy Tart', 'Bruschetta', 'Greek Salad', 'Falafel']
+        # Tied prices, so pages have to break ties on id
+        cls.items = [MenuItem.objects.create(title=title, price=Decimal(5 + index // 2), inventory=5, category=category)
+                     for index, title in enumerate(titles)]
+
+    def setUp(self):
+        cache.clear()
+        catalog_cache.clear()
+
+    def ids(self, response):
+        return [row['id'] for row in response.json()['results']]
+
+    def test_cache_hits_and_invalidation(self):
+        before = catalog_cache.stats()
+        self.assertEqual(self.client.get('/api/menu-items/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/menu-items/')['X-Cache'], 'HIT')
+        after = catalog_cache.stats()
+        self.assertEqual((after['hits'] - before['hits'], after['misses'] - before['misses'], after['entries']), (1, 1, 1))
+
+        self.items[0].title = 'Lemon Soup'
+        self.items[0].save()
+        response = self.client.get('/api/menu-items/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('Lemon Soup', [row['title'] for row in response.json()['results']])
+
+        token = Token.objects.create(user=self.manager).key
+        metrics = self.client.get('/api/metrics/', HTTP_AUTHORIZATION=f'Token {token}').content.decode()
+        self.assertIn(f'littlelemon_cache_hits_total{{cache="catalog"}} {catalog_cache.hits}', metrics)
+        self.assertIn('littlelemon_cache_entries{cache="catalog"} 2', metrics)
+
+    def test_cursor_pages(self):
+        for ordering in ('price', '-price'):
+            expected = [item.pk for item in sorted(self.items, key=lambda item: (item.price, item.pk),
+                                                   reverse=ordering.startswith('-'))]
+            pages = []
+            response = self.client.get(f'/api/menu-items/?page_size=2&ordering={ordering}')
+            while True:
+                pages.append(self.ids(response))
+                if not response.json()['next']:
+                    break
+                response = self.client.get(response.json()['next'])
+            self.assertEqual(sum(pages, []), expected)
+
+            # And back again from the last page
+            for page in reversed(pages[:-1]):
+                response = self.client.get(response.json()['previous'])
+                self.assertEqual(self.ids(response), page)
+            self.assertIsNone(response.json()['previous'])
+
+    def test_bad_cursor(self):
+        # Not base64, and a position without the id
+        for cursor in ('not-a-cursor!', base64.b64encode(b'p=5.00').decode()):
+            self.assertEqual(self.client.get('/api/menu-items/', {'cursor': cursor}).status_code, 404)
+
+    def test_search_matches_prefixes_and_ranks(self):
+        response = self.client.get('/api/menu-items/?search=bru')
+        self.assertEqual(self.ids(response), [self.items[2].pk])
+        response = self.client.get('/api/menu-items/?search=gre+sal')
+        self.assertEqual(self.ids(response), [self.items[3].pk])
+        # The shorter title is the better match
+        response = self.client.get('/api/menu-items/?search=lemon')
+        self.assertEqual(self.ids(response), [self.items[0].pk, self.items[1].pk])
+
+
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'anon': None, 'user': None}})
+class AsyncParityTests(CustomerTestCase):
+    """The async catalog endpoints answer exactly like their sync twins."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for index, title in enumerate(['Lemon Tart', 'Lemon Sorbet', 'Bruschetta', 'Greek Salad']):
+            MenuItem.objects.create(title=title, price=Decimal(5 + index % 2), inventory=5, category=cls.mains)
+
+    def compare(self, path, **headers):
+        sync = self.client.get(f'/api{path}', **headers)
+        asynchronous = self.client.get(f'/api/async{path}', **headers)
+        self.assertEqual(asynchronous.status_code, sync.status_code, path)
+        self.assertEqual(asynchronous.get('WWW-Authenticate'), sync.get('WWW-Authenticate'), path)
+        body = asynchronous.content.decode().replace('/api/async/', '/api/')
+        self.assertEqual(json.loads(body), sync.json(), path)
+        return sync
+
+    def test_menu_items(self):
+        for query in ('', '?search=lemon', '?ordering=-price', '?search=nothing-matches'):
+            self.compare(f'/menu-items/{query}')
+
+    def test_menu_item_pages(self):
+        pages = 0
+        response = self.compare('/menu-items/?page_size=2')
+        while response.json()['next']:
+            response = self.compare(response.json()['next'].split('/api', 1)[1])
+            pages += 1
+        self.assertEqual(pages, 2)
+        self.compare(response.json()['previous'].split('/api', 1)[1])
+
+    def test_menu_item_detail(self):
+        self.compare(f'/menu-items/{self.soup.pk}/')
+        self.assertEqual(self.compare('/menu-items/0/').status_code, 404)
+
+    def test_categories(self):
+        self.compare('/categories/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(self.compare('/categories/').status_code, 401)
+
+
+class SharedCacheTests(SimpleTestCase):
+    """Worker processes on one host share Django's cache."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_workers_see_each_others_versions(self):
+        before = get_catalog_version()
+        self.assertEqual(run_in_workers('from LittleLemonAPI.cache import bump_catalog_version\nbump_catalog_version()'), [0])
+        self.assertNotEqual(get_catalog_version(), before)
+
+    def test_incr_is_atomic_across_processes(self):
+        cache.set('counter', 0, timeout=None)
+        code = 'from django.core.cache import cache\nfor _ in range(100): cache.incr("counter")'
+        self.assertEqual(run_in_workers(code, count=4), [0] * 4)
+        self.assertEqual(cache.get('counter'), 400)
+
+
+class RoleCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('customer', password='lemon-customer')
+        cls.group = Group.objects.create(name=MANAGER)
+
+    def setUp(self):
+        cache.clear()
+
+    def roles(self):
+        # A fresh instance, so only Django's cache can remember the roles
+        return get_roles(User.objects.get(pk=self.user.pk))
+
+    def test_group_changes_invalidate(self):
+        self.assertEqual(self.roles(), frozenset())
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_roles(user), frozenset())
+
+        self.user.groups.add(self.group)
+        self.assertEqual(self.roles(), {MANAGER})
+        self.group.user_set.remove(self.user)
+        self.assertEqual(self.roles(), frozenset())
+        self.group.user_set.add(self.user)
+        self.assertEqual(self.roles(), {MANAGER})
+        self.group.user_set.clear()
+        self.assertEqual(self.roles(), frozenset())
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+        patcher = mock.patch.dict(settings.DATABASES, {REPLICA: {}})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_inside_read_replica(self):
+        self.assertIsNone(self.router.db_for_read(MenuItem))
+        with read_replica():
+            self.assertEqual(self.router.db_for_read(MenuItem), REPLICA)
+            self.assertEqual(self.router.db_for_write(MenuItem), 'default')
+            # A transaction reads its own writes
+            with transaction.atomic():
+                self.assertIsNone(self.router.db_for_read(MenuItem))
+        self.assertFalse(self.router.allow_migrate(REPLICA, 'LittleLemonAPI'))
+
+    def test_needs_a_replica(self):
+        del settings.DATABASES[REPLICA]
+        with read_replica():
+            self.assertIsNone(self.router.db_for_read(MenuItem))
+
+
+class ImmediateTransactionTests(SimpleTestCase):
+    """Concurrent read-then-write transactions on the production backend wait instead of failing."""
+
+    WRITERS = 8
+    TRANSACTIONS = 25
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # A file database configured like the production profile, on the BEGIN IMMEDIATE backend
+        writers = dict(connections['default'].settings_dict, ENGINE='LittleLemonAPI.backends.sqlite3',
+                       NAME=os.path.join(directory.name, 'writers.sqlite3'), OPTIONS={'timeout': 20},
+                       PRAGMAS={'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 20000})
+        patcher = mock.patch.dict(settings.DATABASES, {'writers': writers})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(connections['writers'].close)
+        with connections['writers'].cursor() as cursor:
+            cursor.execute('CREATE TABLE stock (id INTEGER PRIMARY KEY, inventory INTEGER)')
+            cursor.execute('INSERT INTO stock VALUES (1, %s)', [self.WRITERS * self.TRANSACTIONS])
+
+    def checkout(self, errors):
+        try:
+            for _ in range(self.TRANSACTIONS):
+                # Shaped like a checkout: read the stock, then write it back
+                with transaction.atomic(using='writers'), connections['writers'].cursor() as cursor:
+                    cursor.execute('SELECT inventory FROM stock WHERE id = 1')
+                    [inventory] = cursor.fetchone()
+                    # Let the other writers read before this one writes
+                    time.sleep(0.001)
+                    cursor.execute('UPDATE stock SET inventory = %s WHERE id = 1', [inventory - 1])
+        except OperationalError as error:
+            errors.append(error)
+        finally:
+            connections['writers'].close()
+
+    def test_concurrent_writers(self):
+        errors = []
+        threads = [threading.Thread(target=self.checkout, args=(errors,)) for _ in range(self.WRITERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        with connections['writers'].cursor() as cursor:
+            cursor.execute('SELECT inventory FROM stock WHERE id = 1')
+            # No update was lost either
+            self.assertEqual(cursor.fetchone(), (0,))
+
+
+@override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'anon': None, 'user': None}})
+class DispatcherTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        crew_group = Group.objects.create(name=DELIVERY_CREW)
+        cls.crew = [User.objects.create_user(f'crew-{index}', password='lemon-crew') for index in range(3)]
+        crew_group.user_set.add(*cls.crew)
+        cls.customer = User.objects.create_user('customer', password='lemon-customer')
+        for crew, open_orders in zip(cls.crew, (2, 0, 1)):
+            for _ in range(open_orders):
+                Order.objects.create(user=cls.customer, delivery_crew_user=crew, total=Decimal('5.00'), date=date.today())
+        # Delivered orders do not count
+        Order.objects.create(user=cls.customer, delivery_crew_user=cls.crew[1], status=True,
+                             total=Decimal('5.00'), date=date.today())
+        manager = User.objects.create_user('manager', password='lemon-manager')
+        Group.objects.create(name=MANAGER).user_set.add(manager)
+        cls.token = Token.objects.create(user=manager).key
+
+    def setUp(self):
+        dispatcher.reset()
+
+    def open_orders(self):
+        return [Order.objects.filter(delivery_crew_user=crew, status=False).count() for crew in self.crew]
+
+    def test_least_loaded(self):
+        self.assertEqual(dispatcher.choose(), self.crew[1].pk)
+
+    def test_batch(self):
+        Order.objects.bulk_create(
+            Order(user=self.customer, total=Decimal('5.00'), date=date.today()) for _ in range(3)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/order/dispatch/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual((len(response.json()['assigned']), response.json()['unassigned']), (3, 0))
+        self.assertEqual(self.open_orders(), [2, 2, 2])
+        # The in-memory loads followed the batch
+        self.assertEqual(dispatcher.choose(), self.crew[0].pk)
+
+    def test_rolled_back_batch_leaves_the_loads(self):
+        orders = Order.objects.bulk_create(
+            Order(user=self.customer, total=Decimal('5.00'), date=date.today()) for _ in range(2)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(OperationalError), transaction.atomic():
+                self.assertEqual(len(dispatcher.assign_batch(orders)), 2)
+                raise OperationalError('database is locked')
+        self.assertEqual(dispatcher.choose(), self.crew[1].pk)
+
+
+@override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'anon': None, 'user': None}})
+class OrderExportTests(CustomerTestCase):
+    """Managers can stream the whole order history as NDJSON or CSV."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        manager = User.objects.create_user('manager', password='lemon-manager')
+        Group.objects.create(name=MANAGER).user_set.add(manager)
+        cls.manager_token = Token.objects.create(user=manager).key
+        other = User.objects.create_user('other', password='lemon-other')
+        tart = MenuItem.objects.create(title='Lemon Tart', price=Decimal('4.50'), inventory=5, category=cls.mains)
+        cls.items = [
+            OrderItem.objects.create(order=cls.customer, menuitem=cls.soup, quantity=2, unit_price=Decimal('6.00'),
+                                     price=Decimal('12.00')),
+            OrderItem.objects.create(order=cls.customer, menuitem=tart, quantity=1, unit_price=Decimal('4.50'),
+                                     price=Decimal('4.50')),
+            OrderItem.objects.create(order=other, menuitem=tart, quantity=3, unit_price=Decimal('4.50'),
+                                     price=Decimal('13.50')),
+        ]
+
+    def export(self, format, token=None, **headers):
+        return self.client.get(f'/api/order/?format={format}', HTTP_AUTHORIZATION=f'Token {token or self.manager_token}',
+                               **headers)
+
+    def records(self, items):
+        return [{'order': item.order_id, 'menuitem_id': item.menuitem_id, 'quantity': item.quantity,
+                 'unit_price': str(item.unit_price), 'price': str(item.price)} for item in items]
+
+    def test_ndjson(self):
+        response = self.export('ndjson')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="order-items.ndjson"')
+        # Rows are only read from the database while the body is sent
+        with CaptureQueriesContext(connection) as queries:
+            body = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([json.loads(line) for line in body.splitlines()], self.records(self.items))
+
+    def test_csv(self):
+        response = self.export('csv')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="order-items.csv"')
+        body = b''.join(response.streaming_content).decode()
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], ['order', 'menuitem_id', 'quantity', 'unit_price', 'price'])
+        self.assertEqual(rows[1:], [[str(value) for value in record.values()] for record in self.records(self.items)])
+
+    def test_compressed_stream(self):
+        response = self.export('ndjson', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertEqual(len(body.splitlines()), len(self.items))
+
+    def test_customers_get_their_own_orders_unstreamed(self):
+        response = self.export('ndjson', token=self.token)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        self.assertFalse(response.has_header('Content-Disposition'))
+        rows = [json.loads(line) for line in response.content.decode().splitlines()]
+        self.assertEqual(rows, self.records(self.items[:2]))
+
+
+@override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'anon': None, 'user': None}})
+class OrderListTests(CustomerTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Several orders a day, so pages have to break ties on id
+        cls.orders = [Order.objects.create(user=cls.customer, total=Decimal('6.00'), date=date.today() - timedelta(days=index // 2))
+                      for index in range(5)]
+
+    def get(self, path):
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Token {self.token}').json()
+
+    def test_keyset_pages(self):
+        expected = [order.pk for order in sorted(self.orders, key=lambda order: (order.date, order.pk), reverse=True)]
+        pages = [self.get('/api/orders/?page_size=2')]
+        while pages[-1]['next']:
+            pages.append(self.get(pages[-1]['next']))
+        self.assertEqual([order['id'] for page in pages for order in page['results']], expected)
+        self.assertEqual(self.get(pages[-1]['previous'])['results'], pages[-2]['results'])
+
+    def test_backfill_links_items_to_pre_header_orders(self):
+        backfill = importlib.import_module('LittleLemonAPI.migrations.0011_backfill_order_item_header')
+        tart = MenuItem.objects.create(title='Lemon Tart', price=Decimal('4.00'), inventory=5, category=self.mains)
+        soup_item = OrderItem.objects.create(order=self.customer, menuitem=self.soup, quantity=1,
+                                             unit_price=self.soup.price, price=self.soup.price)
+        pending = OrderItem.objects.create(order=self.customer, menuitem=tart, quantity=1, unit_price=tart.price,
+                                           price=tart.price)
+        backfill.link_order_items(django_apps, None)
+        self.assertEqual(OrderItem.objects.get(pk=soup_item.pk).header_id, self.orders[0].pk)
+        # Nothing fits the tart; it was never ordered
+        self.assertIsNone(OrderItem.objects.get(pk=pending.pk).header_id)
+
+
+class SalesSummaryTests(TestCase):
+    """Summaries kept up to date write by write match a full rebuild."""
+
+    def summaries(self):
+        return (
+            sorted(DailySales.objects.filter(orders__gt=0).values_list('date', 'orders', 'revenue_cents')),
+            sorted(MenuItemSales.objects.filter(units__gt=0).values_list('menuitem', 'units', 'revenue_cents')),
+            sorted(CategorySales.objects.filter(units__gt=0).values_list('category', 'units', 'revenue_cents')),
+        )
+
+    def test_incremental_matches_rebuild(self):
+        customer = User.objects.create_user('customer', password='lemon-customer')
+        mains = Category.objects.create(slug='mains', title='Mains')
+        desserts = Category.objects.create(slug='desserts', title='Desserts')
+        soup = MenuItem.objects.create(title='Lemon Soup', price=Decimal('6.00'), inventory=5, category=mains)
+        tart = MenuItem.objects.create(title='Lemon Tart', price=Decimal('4.50'), inventory=5, category=desserts)
+        lamb = MenuItem.objects.create(title='Lamb', price=Decimal('12.00'), inventory=5, category=mains)
+
+        order = Order.objects.create(user=customer, total=Decimal('10.50'), date=date.today())
+        old = Order.objects.create(user=customer, total=Decimal('12.00'), date=date.today() - timedelta(days=3))
+        OrderItem.objects.create(order=customer, menuitem=soup, quantity=1, unit_price=soup.price, price=soup.price, header=order)
+        item = OrderItem.objects.create(order=customer, menuitem=tart, quantity=1, unit_price=tart.price,
+                                        price=tart.price, header=order)
+        OrderItem.objects.create(order=customer, menuitem=lamb, quantity=1, unit_price=lamb.price, price=lamb.price, header=old)
+
+        item.quantity, item.price = 2, Decimal('9.00')
+        item.save()
+        order.total = Decimal('15.00')
+        order.save()
+        old.date = date.today() - timedelta(days=1)
+        old.save()
+        OrderItem.objects.filter(menuitem=lamb).get().delete()
+        old.delete()
+
+        incremental = self.summaries()
+        analytics.rebuild()
+        self.assertEqual(incremental, self.summaries())
+
+
+@override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'anon': None, 'user': None}})
+class MenuImportTests(CustomerTestCase):
+    """Bulk menu imports validate the batch with set-based queries and report errors per row."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        manager = User.objects.create_user('manager', password='lemon-manager')
+        Group.objects.create(name=MANAGER).user_set.add(manager)
+        cls.manager_token = Token.objects.create(user=manager).key
+
+    def post(self, data, content_type='application/json', token=None):
+        if content_type == 'application/json':
+            data = json.dumps(data)
+        return self.client.post('/api/menu-items/import/', data=data, content_type=content_type,
+                                HTTP_AUTHORIZATION=f'Token {token or self.manager_token}')
+
+    def row(self, title, price='5.00', inventory=10, category_id=None):
+        return {'title': title, 'price': price, 'inventory': inventory, 'category_id': category_id or self.mains.pk}
+
+    def test_csv_parser(self):
+        body = b'title , price,inventory,category_id\nLemon Tart,4.50,3,1,surplus\n"Soup, Cold",5.00,2,1\n'
+        rows = CSVParser().parse(io.BytesIO(body), parser_context={'encoding': 'utf-8'})
+        # Header names are stripped, values stay strings and columns without a header are dropped
+        self.assertEqual(rows, [
+            {'title': 'Lemon Tart', 'price': '4.50', 'inventory': '3', 'category_id': '1'},
+            {'title': 'Soup, Cold', 'price': '5.00', 'inventory': '2', 'category_id': '1'},
+        ])
+        with self.assertRaises(ParseError):
+            CSVParser().parse(io.BytesIO(b'title\n\xff\n'), parser_context={'encoding': 'utf-8'})
+
+    def test_creates_and_updates(self):
+        version = get_catalog_version()
+        response = self.post([self.row('Lemon Soup', price='7.00', inventory=2), self.row('Lemon Tart')])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'created': 1, 'updated': 1, 'errors': []})
+        self.soup.refresh_from_db()
+        self.assertEqual((self.soup.price, self.soup.inventory), (Decimal('7.00'), 2))
+        self.assertTrue(MenuItem.objects.filter(title='Lemon Tart', price=Decimal('5.00'), inventory=10).exists())
+        # Bulk writes send no signals, so the import bumps the catalog itself
+        self.assertNotEqual(get_catalog_version(), version)
+
+    def test_csv_import(self):
+        body = f'title,price,inventory,category_id\nLemon Tart,4.50,3,{self.mains.pk}\n'
+        response = self.post(body, content_type='text/csv')
+        self.assertEqual((response.status_code, response.json()['created']), (201, 1))
+        self.assertEqual(MenuItem.objects.get(title='Lemon Tart').price, Decimal('4.50'))
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        # Warm the token and role caches first
+        self.post([self.row('Warm-up')])
+        counts = []
+        for size in (2, 20):
+            with CaptureQueriesContext(connection) as queries:
+                self.post([self.row(f'Dish {size}-{index}') for index in range(size)])
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_row_errors(self):
+        response = self.post([
+            self.row('Cheap', price='1.00'),
+            {'title': 'No price', 'inventory': 1, 'category_id': self.mains.pk},
+            self.row('Lemon Tart'),
+            self.row('Lemon Tart', price='9.00'),
+            self.row('Nowhere', category_id=self.mains.pk + 100),
+            'not a row',
+        ])
+        # The valid row is still saved
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['created'], body['updated']), (1, 0))
+        self.assertEqual([(error['index'], error['title'], list(error['errors'])) for error in body['errors']], [
+            (0, 'Cheap', ['non_field_errors']),
+            (1, 'No price', ['price']),
+            (3, 'Lemon Tart', ['title']),
+            (4, 'Nowhere', ['category_id']),
+            (5, None, ['non_field_errors']),
+        ])
+        self.assertEqual(MenuItem.objects.get(title='Lemon Tart').price, Decimal('5.00'))
+        self.assertFalse(MenuItem.objects.filter(title__in=['Cheap', 'No price', 'Nowhere']).exists())
+
+    def test_rejected_batches(self):
+        self.assertEqual(self.post([self.row('Cheap', price='1.00')]).status_code, 400)
+        self.assertEqual(self.post({'title': 'Not a list'}).status_code, 400)
+        with self.settings(MENU_IMPORT_MAX_ROWS=1):
+            self.assertEqual(self.post([self.row('One'), self.row('Two')]).status_code, 400)
+        self.assertEqual(self.post([self.row('Lemon Tart')], token=self.token).status_code, 403)
+        self.assertFalse(MenuItem.objects.exclude(pk=self.soup.pk).exists())
+
+
+@override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'anon': None, 'user': None}})
+class InventoryReservationTests(CustomerTestCase):
+    """Carts hold stock with conditional updates; checkout never oversells."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tart = MenuItem.objects.create(title='Lemon Tart', price=Decimal('4.00'), inventory=1, category=cls.mains)
+
+    def post(self, path, data=None):
+        return self.client.post(path, data=json.dumps(data), content_type='application/json',
+                                HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def test_adding_to_cart_reserves_stock(self):
+        self.assertEqual(self.post('/api/cart/menu-items/', {'item': 'Lemon Soup', 'quantity': 2}).status_code, 201)
+        self.assertEqual(self.stock(self.soup), 3)
+        self.assertIsNotNone(Cart.objects.get(item=self.soup).reserved_until)
+
+        self.client.delete('/api/cart/menu-items/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(self.stock(self.soup), 5)
+
+    def test_cart_cannot_take_more_than_stock(self):
+        response = self.post('/api/cart/menu-items/', {'item': 'Lemon Tart', 'quantity': 2})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['menuitem_ids'], [self.tart.pk])
+        self.assertEqual(self.stock(self.tart), 1)
+        self.assertFalse(Cart.objects.exists())
+
+    def test_batch_keeps_entries_that_fit(self):
+        response = self.post('/api/cart/menu-items/', [{'item': 'Lemon Soup', 'quantity': 4}, {'item': 'Lemon Tart', 'quantity': 3}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1])
+        self.assertEqual((self.stock(self.soup), self.stock(self.tart)), (1, 1))
+
+        # Lowering a quantity gives the difference back
+        self.post('/api/cart/menu-items/', [{'item': 'Lemon Soup', 'quantity': 1}])
+        self.assertEqual(self.stock(self.soup), 4)
+
+    def test_expired_reservations_are_released_and_retaken_at_checkout(self):
+        self.post('/api/cart/menu-items/', {'item': 'Lemon Tart', 'quantity': 1})
+        Cart.objects.update(reserved_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(inventory.release_expired(), 1)
+        self.assertEqual(self.stock(self.tart), 1)
+        self.assertIsNone(Cart.objects.get().reserved_until)
+
+        # Someone else buys the last tart in the meantime
+        MenuItem.objects.filter(pk=self.tart.pk).update(inventory=0)
+        self.assertEqual(self.post('/api/order/').status_code, 409)
+        self.assertTrue(Cart.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+        MenuItem.objects.filter(pk=self.tart.pk).update(inventory=1)
+        self.assertEqual(self.post('/api/order/').status_code, 201)
+        self.assertEqual(self.stock(self.tart), 0)
+        self.assertFalse(Cart.objects.exists())
+
+
+_flaky_failures = []
+
+
+@jobs.task('test_flaky')
+def flaky_task(payload):
+    if len(_flaky_failures) < payload['failures']:
+        _flaky_failures.append(1)
+        raise OperationalError('database is locked')
+    return {'ok': True}
+
+
+@override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'anon': None, 'user': None}}, JOB_QUEUE_AUTOSTART=False)
+class JobQueueTests(TestCase):
+    """Order finalization runs as a background job with retries and backpressure."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', password='lemon-manager')
+        Group.objects.create(name=MANAGER).user_set.add(cls.manager)
+        crew = User.objects.create_user('crew', password='lemon-crew')
+        Group.objects.create(name=DELIVERY_CREW).user_set.add(crew)
+        customer = User.objects.create_user('customer', password='lemon-customer')
+        category = Category.objects.create(slug='mains', title='Mains')
+        items = [MenuItem.objects.create(title=f'Dish {index}', price=Decimal('5.00'), inventory=5, category=category)
+                 for index in range(2)]
+        cls.order_items = [OrderItem.objects.create(order=customer, menuitem=item, quantity=1,
+                                                    unit_price=item.price, price=item.price) for item in items]
+        cls.token = Token.objects.create(user=cls.manager).key
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        bucket_store.clear()
+        dispatcher.reset()
+        _flaky_failures.clear()
+
+    def post_order(self):
+        return self.client.post(f'/api/order/{self.order_items[0].pk}/', {'status': 0},
+                                HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def test_order_is_finalized_in_the_background(self):
+        response = self.post_order()
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Order.objects.exists())
+
+        self.assertEqual(jobs.run_pending(), 1)
+        status_response = self.client.get(response['Location'], HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(status_response.json()['status'], Job.DONE)
+        order = Order.objects.get()
+        self.assertEqual(status_response.json()['result']['id'], order.pk)
+        self.assertEqual(order.total, Decimal('10.00'))
+        self.assertEqual(set(order.items.values_list('pk', flat=True)), {item.pk for item in self.order_items})
+
+    def test_status_is_validated_before_enqueueing(self):
+        response = self.client.post(f'/api/order/{self.order_items[0].pk}/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.json())
+        self.assertFalse(Job.objects.exists())
+
+    def test_lock_contention_is_retried_with_backoff(self):
+        job = jobs.enqueue('test_flaky', {'failures': 2})
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now())
+        # Not due yet
+        self.assertEqual(jobs.run_pending(), 0)
+
+        for _ in range(2):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.result), (Job.DONE, 3, {'ok': True}))
+
+    @override_settings(JOB_MAX_ATTEMPTS=2)
+    def test_gives_up_after_max_attempts(self):
+        job = jobs.enqueue('test_flaky', {'failures': 5})
+        for _ in range(3):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('database is locked', job.error)
+
+    @override_settings(JOB_QUEUE_MAX_PENDING=1)
+    def test_backpressure(self):
+        self.assertEqual(self.post_order().status_code, 202)
+        response = self.post_order()
+        self.assertEqual(response.status_code, 503)
+        self.assertTrue(response.has_header('Retry-After'))
+
+
+class IdempotencyTests(CustomerTestCase):
+    """Retried POSTs with the same Idempotency-Key run once and replay the response."""
+
+    def setUp(self):
+        super().setUp()
+        idempotency.responses.clear()
+
+    def post(self, path, data=None, key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key is not None else {}
+        return self.client.post(path, data=json.dumps(data), content_type='application/json',
+                                HTTP_AUTHORIZATION=f'Token {self.token}', **headers)
+
+    def test_retried_cart_and_checkout_run_once(self):
+        for attempt in range(2):
+            response = self.post('/api/cart/menu-items/', {'item': 'Lemon Soup', 'quantity': 2}, key='add-soup')
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(Cart.objects.get().quantity, 2)
+        self.soup.refresh_from_db()
+        self.assertEqual(self.soup.inventory, 3)
+
+        first = self.post('/api/order/', key='checkout')
+        replay = self.post('/api/order/', key='checkout')
+        self.assertEqual((first.status_code, replay.status_code), (201, 201))
+        self.assertEqual(first.json(), replay.json())
+        self.assertEqual(OrderItem.objects.count(), 1)
+
+        # Without a key the POST runs again and finds the dish already ordered
+        self.post('/api/cart/menu-items/', {'item': 'Lemon Soup', 'quantity': 1})
+        self.assertEqual(self.post('/api/order/').status_code, 400)
+
+    def test_key_reused_with_another_body(self):
+        self.post('/api/cart/menu-items/', {'item': 'Lemon Soup', 'quantity': 1}, key='add')
+        response = self.post('/api/cart/menu-items/', {'item': 'Lemon Soup', 'quantity': 3}, key='add')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Cart.objects.get().quantity, 1)
+        self.assertEqual(self.post('/api/cart/menu-items/', {'item': 'Lemon Soup'}, key='x' * 256).status_code, 400)
+
+    def test_concurrent_duplicates_collapse(self):
+        calls = []
+        running = threading.Event()
+        release = threading.Event()
+
+        @api_view(['POST'])
+        @permission_classes([AllowAny])
+        @throttle_classes([])
+        @idempotency.idempotent
+        def slow_view(request):
+            calls.append(1)
+            running.set()
+            release.wait(5)
+            return Response({'calls': len(calls)}, status=201)
+
+        factory = APIRequestFactory()
+        responses = []
+
+        def send():
+            request = factory.post('/slow/', {'a': 1}, format='json', HTTP_IDEMPOTENCY_KEY='same')
+            responses.append(slow_view(request))
+
+        threads = [threading.Thread(target=send) for _ in range(3)]
+        threads[0].start()
+        running.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([response.data for response in responses], [{'calls': 1}] * 3)
+        self.assertEqual(sum(response.has_header('Idempotent-Replayed') for response in responses), 2)
+
+
+class ConditionalGetTests(CustomerTestCase):
+    """Catalog and cart reads answer If-None-Match / If-Modified-Since from version stamps."""
+
+    def get(self, path, **headers):
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Token {self.token}', **headers)
+
+    def test_menu_items(self):
+        response = self.get('/api/menu-items/')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+
+        with self.assertNumQueries(0):
+            not_modified = self.get('/api/menu-items/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+        self.assertEqual(self.get('/api/menu-items/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        # Another representation of the same resource
+        self.assertEqual(self.get('/api/menu-items/?ordering=price', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.soup.price = Decimal('7.00')
+        self.soup.save()
+        response = self.get('/api/menu-items/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.get('/api/categories/', HTTP_IF_NONE_MATCH=self.get('/api/categories/')['ETag']).status_code, 304)
+
+    def test_changes_within_a_second(self):
+        modified = self.get('/api/menu-items/')['Last-Modified']
+        self.soup.price = Decimal('7.00')
+        self.soup.save()
+        response = self.get('/api/menu-items/', HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(parse_http_date(response['Last-Modified']), parse_http_date(modified))
+
+    def test_cart(self):
+        etag = self.get('/api/cart/menu-items/')['ETag']
+        self.assertEqual(self.get('/api/cart/menu-items/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.post('/api/cart/menu-items/', {'item': 'Lemon Soup'}, HTTP_AUTHORIZATION=f'Token {self.token}')
+        response = self.get('/api/cart/menu-items/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(self.get('/api/cart/menu-items/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+    def test_stock_changes_reach_the_catalog(self):
+        path = f'/api/menu-items/{self.soup.pk}/'
+        etag = self.get(path)['ETag']
+
+        with self.settings(CATALOG_STOCK_DEBOUNCE=60), self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/cart/menu-items/', {'item': 'Lemon Soup', 'quantity': 2},
+                             HTTP_AUTHORIZATION=f'Token {self.token}')
+        response = self.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response['X-Cache'], response.json()['inventory']), (200, 'MISS', 3))
+        etag = response['ETag']
+
+        # Inside the window the change waits; the first read after it publishes it
+        with self.settings(CATALOG_STOCK_DEBOUNCE=60), self.captureOnCommitCallbacks(execute=True):
+            self.client.delete('/api/cart/menu-items/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(self.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        cache.delete(STOCK_DEBOUNCE_KEY)
+        response = self.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.json()['inventory']), (200, 5))
+
+
+SMALL_VOLUMES = synthetic.Volumes(customers=30, managers=1, crew=2, categories=3, menu_items=40, cart_fraction=0.5)
+
+
+class SyntheticDataTests(TestCase):
+    """generate_synthetic_data writes rows the API accepts."""
+
+    def test_generated_rows_are_consistent(self):
+        counts = synthetic.generate(SMALL_VOLUMES, seed=1)
+        self.assertEqual(counts['User'], 33)
+        self.assertEqual(counts['Token'], 33)
+        self.assertEqual(counts['OrderItem'], OrderItem.objects.count())
+        self.assertGreater(counts['Order'], 0)
+        self.assertGreater(counts['Cart'], 0)
+
+        for order in Order.objects.prefetch_related('items'):
+            self.assertEqual(order.total, sum(item.price for item in order.items.all()))
+            self.assertTrue(all(item.order_id == order.user_id for item in order.items.all()))
+        ordered = set(OrderItem.objects.values_list('order_id', 'menuitem_id'))
+        self.assertFalse(ordered & set(Cart.objects.values_list('user_id', 'item_id')))
+        self.assertEqual(User.objects.filter(groups__name=DELIVERY_CREW).count(), 2)
+
+        with self.assertRaises(ValueError):
+            synthetic.generate(SMALL_VOLUMES)
+
+
+class LoadTestTests(LiveServerTestCase):
+    """The load generator drives a live server through every scenario."""
+
+    def test_short_run(self):
+        synthetic.generate(SMALL_VOLUMES, seed=2)
+        fixtures, menu = loadtest.load_fixtures('load-', 2, seed=2)
+        # One virtual user keeps SQLite writes from contending
+        report = asyncio.run(loadtest.run(self.live_server_url, fixtures, menu, concurrency=1, duration=1.5, seed=2))
+
+        self.assertGreater(report['requests'], 0)
+        self.assertGreater(report['throughput_rps'], 0)
+        self.assertEqual(report['errors'], 0)
+        self.assertIn('GET menu-items', report['endpoints'])
+        self.assertLessEqual(report['endpoints']['GET menu-items']['p50_ms'], report['endpoints']['GET menu-items']['max_ms'])
@@ -0,0 +1,158 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.settings import api_settings
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+
+class SQLiteBucketStore:
+    """
+    Token buckets kept in a small SQLite file shared by every worker process.
+
+    Each key is one row of (tokens, updated), so state stays O(1) per client
+    however high the rate. A consume is a single BEGIN IMMEDIATE transaction,
+    which makes read-refill-write atomic across processes. A consume that
+    cannot get the write lock within `timeout` seconds raises
+    sqlite3.OperationalError ("database is locked").
+    """
+    # Roughly one consume in this many also deletes idle buckets
+    prune_every = 1000
+
+    def __init__(self, path, timeout=0.1):
+        self.path = str(path)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def open(self, path):
+        """Switch to the store at `path`; every thread reconnects on its next consume."""
+        self.path = str(path)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.path != self.path:
+            connection.close()
+            connection = None
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Throttle state may lose the last few writes on power loss
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL'
+                ') WITHOUT ROWID'
+            )
+            self._local.connection = connection
+            self._local.path = self.path
+        return connection
+
+    def consume(self, key, capacity, refill_rate):
+        """
+        Take one token from `key`'s bucket.
+
+        Return (allowed, wait) where wait is the number of seconds until a
+        token becomes available when the request is refused.
+        """
+        now = time.time()
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, row[0] + (now - row[1]) * refill_rate)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            connection.execute(
+                'INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                (key, tokens, now),
+            )
+            if random.randrange(self.prune_every) == 0:
+                self.prune(connection, now, capacity / refill_rate)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        wait = 0 if allowed else (1 - tokens) / refill_rate
+        return allowed, wait
+
+    def prune(self, connection, now, idle_seconds):
+        # A bucket idle this long has refilled completely, so forgetting it
+        # is the same as keeping it
+        connection.execute('DELETE FROM buckets WHERE updated < ?', (now - idle_seconds,))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM buckets')
+
+
+def _store_path():
+    return getattr(settings, 'THROTTLE_STORE_PATH', settings.BASE_DIR / 'throttle.sqlite3')
+
+
+bucket_store = SQLiteBucketStore(_store_path(), timeout=getattr(settings, 'THROTTLE_STORE_TIMEOUT', 0.1))
+
+
+@receiver(setting_changed)
+def reload_store(setting, **kwargs):
+    # So tests can move the store with override_settings()
+    if setting == 'THROTTLE_STORE_PATH':
+        bucket_store.open(_store_path())
+
+
+class TokenBucketMixin:
+    """
+    Replace SimpleRateThrottle's timestamp history with a token bucket.
+
+    A rate of "N/period" gives a bucket of N tokens refilled at N per period,
+    so bursts up to N are allowed and the long-run rate is the same as the
+    sliding window's.
+    """
+
+    @property
+    def THROTTLE_RATES(self):
+        # Read the rates on every request rather than once at import time
+        # like SimpleRateThrottle, so override_settings() applies to them
+        return api_settings.DEFAULT_THROTTLE_RATES
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        try:
+            allowed, self._wait = bucket_store.consume(
+                self.key, self.num_requests, self.num_requests / self.duration
+            )
+        except sqlite3.Error as error:
+            if str(error) == 'database is locked':
+                # Letting requests through whenever the store is contended
+                # would lift the limit exactly when clients hammer it
+                self._wait = bucket_store.timeout
+                return False
+            # An unavailable store must not take the API down with it
+            return True
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class AnonTokenBucketThrottle(TokenBucketMixin, AnonRateThrottle):
+    pass
+
+
+class UserTokenBucketThrottle(TokenBucketMixin, UserRateThrottle):
+    pass
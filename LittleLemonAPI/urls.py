@@ -1,8 +1,10 @@
 from django.urls import path, include
 from .views import *
+from . import async_views
 
 urlpatterns = [
     path('menu-items/', MenuItemsView.as_view(), name='menu-items-list'),
+    path('menu-items/import/', import_menu_items, name='menu-items-import'),
     path('menu-items/<int:pk>/', SingleMenuItemView.as_view(), name='menu-item-detail'),
     path('categories/', CategoryView.as_view(), name='category-list'),
     path('groups/<str:group_name>/users',list_group_members),
@@ -10,4 +12,14 @@ urlpatterns = [
     path('cart/menu-items/', CartView),
     path('order/', OrderView.as_view()),
     path('order/<int:orderId>/', OrderDetailView.as_view()),    
+    path('order/dispatch/', dispatch_pending_orders, name='dispatch-pending-orders'),
+    path('orders/', OrdersView.as_view(), name='order-list'),
+    path('orders/<int:pk>/', SingleOrderView.as_view(), name='order-detail'),
+    path('jobs/<int:pk>/', job_detail, name='job-detail'),
+    path('analytics/sales/', sales_analytics, name='sales-analytics'),
+    path('metrics/', metrics, name='metrics'),
+    # Async versions of the catalog reads for ASGI deployments
+    path('async/menu-items/', async_views.menu_items, name='menu-items-list-async'),
+    path('async/menu-items/<int:pk>/', async_views.menu_item_detail, name='menu-item-detail-async'),
+    path('async/categories/', async_views.categories, name='category-list-async'),
 ]
@@ -1,56 +1,143 @@
-from rest_framework import generics
-from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework import generics, serializers
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
 from .models import *
 from .serializer import *
 from rest_framework.views import APIView
 from rest_framework import status
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 from rest_framework.filters import OrderingFilter, SearchFilter
-from rest_framework.exceptions import PermissionDenied, NotFound
-from django.contrib.auth.models import User, Group
+from rest_framework.exceptions import PermissionDenied, NotFound, ValidationError
+from django.contrib.auth.models import Group
 from functools import wraps
 from decimal import Decimal
-from datetime import datetime, timedelta
+from .cache import CatalogCacheMixin, bump_cart_version, bump_catalog_version, catalog_cache
+from .parsers import CSVParser
+from django.conf import settings
+from .pagination import KeysetCursorPagination, OrderKeysetPagination
+from .search import FullTextSearchFilter
+from .routers import ReadReplicaMixin
+from .renderers import NDJSONRenderer, CSVRenderer
+from .compression import compress_response
+from django.utils.decorators import method_decorator
+from rest_framework.settings import api_settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db import transaction
+from django.db.models import Prefetch
+from .permissions import IsManager
+from .roles import MANAGER, DELIVERY_CREW, get_roles, has_role
+from .dispatch import dispatcher
+from . import analytics, inventory, jobs
+from django.urls import reverse
+from .authentication import token_cache
+from .metrics import registry, render_cache_stats
+from .idempotency import idempotent
+from .conditional import cart_versions, catalog_versions, conditional
 
 
 # Create your views here.
-class MenuItemsView(generics.ListAPIView, generics.ListCreateAPIView):
-    queryset = MenuItem.objects.all()
+@method_decorator(compress_response, name='dispatch')
+@method_decorator(conditional(catalog_versions), name='get')
+class MenuItemsView(ReadReplicaMixin, CatalogCacheMixin, generics.ListAPIView, generics.ListCreateAPIView):
+    queryset = MenuItem.objects.select_related('category')
     serializer_class = MenuItemSerializer
     ordering_fields = ['price']
-    filter_backends = [OrderingFilter, SearchFilter]
+    filter_backends = [FullTextSearchFilter, OrderingFilter]
     search_fields = ['title']
-    throttle_classes = [AnonRateThrottle, UserRateThrottle]
+    pagination_class = KeysetCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        # Same payload as MenuItemSerializer, built from values() rows
+        queryset = menu_item_list_serializer.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(menu_item_list_serializer.to_representation(queryset))
+        return self.get_paginated_response(menu_item_list_serializer.to_representation(page))
+
     def get_permissions(self):
         if self.request.method == 'GET':
             return [AllowAny()]
         elif self.request.method == 'POST':
-            if self.request.user.groups.filter(name='Manager').exists():
-                return [IsAuthenticated()]
-            else:
-                raise PermissionDenied("Request denied, only Manager users allowed") 
+            return [IsAuthenticated(), IsManager()]
         else:
             raise PermissionDenied("Request denied, if you want to update or delete you have to select single item")
 
-class SingleMenuItemView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = MenuItem.objects.all()
+@method_decorator(conditional(catalog_versions), name='get')
+class SingleMenuItemView(ReadReplicaMixin, CatalogCacheMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = MenuItem.objects.select_related('category')
     serializer_class = MenuItemSerializer
-    throttle_classes = [AnonRateThrottle, UserRateThrottle]
     def get_permissions(self):
         if self.request.method == 'GET':
             return [AllowAny()]
-        elif self.request.user.groups.filter(name='Manager').exists():
-            return [IsAuthenticated()]
+        return [IsAuthenticated(), IsManager()]
+
+@api_view(['POST'])
+@parser_classes([JSONParser, CSVParser])
+@permission_classes([IsAuthenticated, IsManager])
+def import_menu_items(request):
+    """
+    Create or update many menu items in one request.
+
+    The body is a JSON list or a CSV file (Content-Type: text/csv) with
+    title, price, inventory and category_id columns. Rows whose title
+    already exists update that item, the others are created. The batch is
+    checked with one title__in and one category query and written with
+    bulk_create/bulk_update in a single transaction. Invalid rows are
+    reported by index and do not prevent the valid ones from being saved.
+    """
+    rows = request.data
+    if not isinstance(rows, list):
+        return Response({'message': 'Expected a list of menu items'}, status=status.HTTP_400_BAD_REQUEST)
+    max_rows = getattr(settings, 'MENU_IMPORT_MAX_ROWS', 5000)
+    if len(rows) > max_rows:
+        return Response({'message': f'At most {max_rows} menu items per import'}, status=status.HTTP_400_BAD_REQUEST)
+
+    errors = []
+    valid_rows = {}
+    for index, row in enumerate(rows):
+        row_serializer = MenuItemImportSerializer(data=row)
+        title = row.get('title') if isinstance(row, dict) else None
+        if not row_serializer.is_valid():
+            errors.append({'index': index, 'title': title, 'errors': row_serializer.errors})
+        elif row_serializer.validated_data['title'] in valid_rows:
+            errors.append({'index': index, 'title': title, 'errors': {'title': ['Title appears more than once in the import']}})
         else:
-            raise PermissionDenied("Request denied, only Manager users allowed")
+            valid_rows[row_serializer.validated_data['title']] = (index, row_serializer.validated_data)
+
+    category_ids = {data['category_id'] for _, data in valid_rows.values()}
+    known_categories = set(Category.objects.filter(pk__in=category_ids).values_list('pk', flat=True))
+    existing = {item.title: item for item in MenuItem.objects.filter(title__in=valid_rows)}
+
+    new_items, changed_items = [], []
+    for title, (index, data) in valid_rows.items():
+        if data['category_id'] not in known_categories:
+            errors.append({'index': index, 'title': title, 'errors': {'category_id': ['Category not found']}})
+            continue
+        item = existing.get(title)
+        if item is None:
+            new_items.append(MenuItem(**data))
+        else:
+            item.price, item.inventory, item.category_id = data['price'], data['inventory'], data['category_id']
+            changed_items.append(item)
+
+    if new_items or changed_items:
+        with transaction.atomic():
+            MenuItem.objects.bulk_create(new_items)
+            MenuItem.objects.bulk_update(changed_items, ['price', 'inventory', 'category'], batch_size=500)
+        # Bulk writes send no signals; bump once the rows are visible so
+        # nothing older gets cached under the new version
+        bump_catalog_version()
+
+    errors.sort(key=lambda error: error['index'])
+    response_status = status.HTTP_201_CREATED if new_items or changed_items else status.HTTP_400_BAD_REQUEST
+    return Response({'created': len(new_items), 'updated': len(changed_items), 'errors': errors}, status=response_status)
 
 def group_required(group_name):
     def decorator(view_func):
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
-            if request.user.groups.filter(name=group_name).exists():
+            if has_role(request.user, group_name):
                 return view_func(request, *args, **kwargs)
             else:
                 return Response("Permission denied. User must be in the 'Manager' group.", status=status.HTTP_403_FORBIDDEN)
@@ -91,7 +178,6 @@ def list_group_members(request, group_name):
 @permission_classes([IsAuthenticated])
 @group_required('Manager')
 def remove_user_from_group(request, group_name, user_id):
-    throttle_classes = [AnonRateThrottle, UserRateThrottle]
     User = get_user_model()
     try:
         user = User.objects.get(pk=user_id)
@@ -106,32 +192,34 @@ def remove_user_from_group(request, group_name, user_id):
     except Group.DoesNotExist:
         return Response(f"Group with name '{group_name}' not found", status=status.HTTP_404_NOT_FOUND)
 
-class CategoryView(generics.ListCreateAPIView):
+@method_decorator(conditional(catalog_versions), name='get')
+class CategoryView(ReadReplicaMixin, generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     def get_permissions(self):
-        print(f"User: {self.request.user}")
-    
         if self.request.method == 'GET':
             return [IsAuthenticated()]
-        elif self.request.user.groups.filter(name='Manager').exists():
-            print("User is in 'Manager' group.")
+        elif has_role(self.request.user, MANAGER):
             return [IsAuthenticated()]
         else:
-            print("Permission denied.")
             raise PermissionDenied("Request denied, only Manager users allowed")
         
+@compress_response
 @api_view(['GET', 'POST', 'DELETE'])
 @permission_classes([IsAuthenticated])
+@conditional(cart_versions)
+@idempotent
 def CartView(request):
     user = request.user
-    throttle_classes = [AnonRateThrottle, UserRateThrottle]
     if request.method == 'GET':
         carts = Cart.objects.filter(user=user)
-        serializer = CartSerializer(carts, many=True)
-        return Response(serializer.data)
+        return Response(cart_list_serializer.serialize(carts))
 
     elif request.method == 'POST':
+        # A list body adds several dishes in one round trip
+        if isinstance(request.data, list):
+            return add_cart_entries(user, request.data)
+
         item_title = request.data.get('item')
         quantity = request.data.get('quantity', 1)  # Default to 1 if quantity is not provided
         
@@ -148,28 +236,120 @@ def CartView(request):
         }
         serializer = CartSerializer(data=data)
         if serializer.is_valid():
-            serializer.save(user=user)
+            with transaction.atomic():
+                # Raises InsufficientInventory (409) when the dish runs short
+                inventory.reserve({item.pk: serializer.validated_data['quantity']})
+                serializer.save(user=user, reserved_until=inventory.reservation_deadline())
+            bump_cart_version(user.pk)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     elif request.method == 'DELETE':
-        Cart.objects.filter(user=user).delete()
+        inventory.release_cart(user)
+        bump_cart_version(user.pk)
         return Response({'message': 'Cart emptied successfully'}, status=status.HTTP_204_NO_CONTENT)
 
     return Response({'message': 'Invalid request'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class OrderView(APIView):
+def add_cart_entries(user, entries):
+    """
+    Add or update several cart rows with a fixed number of queries.
+
+    Titles are resolved with one `title__in` query and all rows are written
+    with a single upsert on the ('item', 'user') constraint, so re-adding a
+    dish replaces its quantity. Stock for the whole batch is reserved (or,
+    for lowered quantities, released) in one conditional update. Invalid
+    entries and dishes that run short are reported by index and do not
+    prevent the valid ones from being saved.
+    """
+    errors = []
+    valid_entries = []
+    for index, entry in enumerate(entries):
+        # Field validation only, no queries per entry
+        entry_serializer = CartEntrySerializer(data=entry)
+        if entry_serializer.is_valid():
+            valid_entries.append((index, entry_serializer.validated_data['item'], entry_serializer.validated_data['quantity']))
+        else:
+            title = entry.get('item') if isinstance(entry, dict) else None
+            errors.append({'index': index, 'item': title, 'errors': entry_serializer.errors})
+
+    titles = {title for _, title, _ in valid_entries}
+    items = {item.title: item for item in MenuItem.objects.filter(title__in=titles)}
+
+    price_field = CartSerializer().fields['price']
+    rows = {}
+    indexes = {}
+    for index, title, quantity in valid_entries:
+        item = items.get(title)
+        if item is None:
+            errors.append({'index': index, 'item': title, 'errors': {'item': ['Item not found']}})
+            continue
+        if item.pk in rows:
+            errors.append({'index': index, 'item': title, 'errors': {'item': ['Item appears more than once in the batch']}})
+            continue
+        price = item.price * quantity
+        try:
+            price_field.run_validation(str(price))
+        except serializers.ValidationError as exc:
+            errors.append({'index': index, 'item': title, 'errors': {'price': exc.detail}})
+            continue
+        rows[item.pk] = Cart(user=user, item=item, quantity=quantity, unit_price=item.price, price=price)
+        indexes[item.pk] = index
+
+    created = []
+    while rows:
+        try:
+            with transaction.atomic():
+                held = inventory.held_quantities(Cart.objects.select_for_update().filter(user=user, item_id__in=rows))
+                inventory.adjust({pk: row.quantity - held[pk] for pk, row in rows.items()})
+                reserved_until = inventory.reservation_deadline()
+                for row in rows.values():
+                    row.reserved_until = reserved_until
+                Cart.objects.bulk_create(
+                    rows.values(),
+                    update_conflicts=True,
+                    unique_fields=['item', 'user'],
+                    update_fields=['quantity', 'unit_price', 'price', 'reserved_until'],
+                )
+                # Upserted rows do not get their primary keys back, so read them once
+                created = CartSerializer(Cart.objects.filter(user=user, item_id__in=rows), many=True).data
+            break
+        except inventory.InsufficientInventory as exc:
+            if not exc.menuitem_ids:
+                raise
+            # Drop the dishes that ran short and save the rest
+            for pk in exc.menuitem_ids:
+                row = rows.pop(pk)
+                errors.append({'index': indexes[pk], 'item': row.item.title, 'errors': {'quantity': ['Not enough inventory']}})
+
+    errors.sort(key=lambda error: error['index'])
+    if created:
+        bump_cart_version(user.pk)
+    response_status = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+    return Response({'created': created, 'errors': errors}, status=response_status)
+
+
+@method_decorator(compress_response, name='dispatch')
+class OrderView(ReadReplicaMixin, APIView):
     ordering_fields = ['order']
     filter_backends = [OrderingFilter, SearchFilter]
     search_fields = ['order']
-    throttle_classes = [AnonRateThrottle, UserRateThrottle]
-    @permission_classes([IsAuthenticated])
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer, CSVRenderer]
+    export_fields = ('order', 'menuitem_id', 'quantity', 'unit_price', 'price')
+    # permission_classes() only takes effect on function views, so the
+    # method decorators this class used to carry were never applied
+    permission_classes = [IsAuthenticated]
+
     def get(self, request):
         user = request.user
-        if user.groups.filter(name='Manager').exists():
+        roles = get_roles(user)
+        if MANAGER in roles:
+            # ?format=ndjson / ?format=csv streams the full history instead
+            if request.accepted_renderer.format in ('ndjson', 'csv'):
+                return self.stream_export(request, OrderItem.objects.all())
             orders = OrderItem.objects.all()
-        elif user.groups.filter(name='delivery-crew').exists():
+        elif DELIVERY_CREW in roles:
             # Filter OrderItem instances based on the order and delivery crew
             delivery_crew = user.pk
             orders = OrderItem.objects.filter(order__delivery_crew=delivery_crew)
@@ -179,43 +359,117 @@ class OrderView(APIView):
             except:
                 return Response({"No user provided"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Serialize orders
-        serializer = OrderItemSerializer(orders, many=True)
-        
-        return Response(serializer.data)
+        return Response(order_item_list_serializer.serialize(orders))
+
+    def stream_export(self, request, queryset):
+        renderer = request.accepted_renderer
+        rows = queryset.order_by('id').values_list(
+            'order_id', 'menuitem_id', 'quantity', 'unit_price', 'price'
+        ).iterator(chunk_size=2000)
+        # Same field names and decimal-as-string values as OrderItemSerializer
+        records = (
+            dict(zip(self.export_fields, (order, menuitem, quantity, str(unit_price), str(price))))
+            for order, menuitem, quantity, unit_price, price in rows
+        )
+        if renderer.format == 'csv':
+            content = renderer.stream(records, header=self.export_fields)
+        else:
+            content = renderer.stream(records)
+
+        response = StreamingHttpResponse(content, content_type=f'{renderer.media_type}; charset={renderer.charset}')
+        response['Content-Disposition'] = f'attachment; filename="order-items.{renderer.format}"'
+        return response
     
-    @permission_classes([IsAuthenticated])
+    @method_decorator(idempotent)
     def post(self, request):
         # Get the current user
         user = request.user
         
-        # Retrieve current cart items from the cart endpoints
-        cart_items = Cart.objects.filter(user=user)
-        
-        # Create order items for each cart item
-        order_items = []
-        for cart_item in cart_items:
-            order_item_data = {
-                'order': user.id,
-                'menuitem_id': cart_item.item.id,
-                'quantity': cart_item.quantity,
-                'unit_price': cart_item.unit_price,
-                'price': cart_item.price
-            }
-            order_item_serializer = OrderItemSerializer(data=order_item_data)
-            if order_item_serializer.is_valid():
-                order_item = order_item_serializer.save()
-                order_items.append(order_item)
-            else:
-                return Response(order_item_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Delete all items from the cart for this user
-        cart_items.delete()
+        # Checkout runs in one transaction with a fixed number of queries:
+        # read the cart, check for conflicts, insert the order items, empty the cart.
+        with transaction.atomic():
+            cart_items = list(Cart.objects.select_for_update().filter(user=user))
+            menuitem_ids = [cart_item.item_id for cart_item in cart_items]
+
+            # One query replaces the per-row UniqueTogetherValidator lookups
+            if OrderItem.objects.filter(order=user, menuitem_id__in=menuitem_ids).exists():
+                return Response(
+                    {'non_field_errors': ['The fields order, menuitem must make a unique set.']},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            # Held rows already took their stock when they were added; rows
+            # whose reservation expired and was released take it now
+            # (InsufficientInventory, 409, when a dish has run out)
+            expired = {}
+            for cart_item in cart_items:
+                if cart_item.reserved_until is None:
+                    expired[cart_item.item_id] = cart_item.quantity
+            inventory.reserve(expired)
+
+            order_items = OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=user,
+                    menuitem_id=cart_item.item_id,
+                    quantity=cart_item.quantity,
+                    unit_price=cart_item.unit_price,
+                    price=cart_item.price,
+                )
+                for cart_item in cart_items
+            ])
+            # bulk_create sends no signals, so update the sales summaries here
+            analytics.record_order_items(order_items)
+
+            # Delete exactly the rows that were ordered, not anything added since
+            Cart.objects.filter(pk__in=[cart_item.pk for cart_item in cart_items]).delete()
+        bump_cart_version(user.pk)
         return Response("Order created successfully. Cart is now empty.", status=status.HTTP_201_CREATED)
 
-class OrderDetailView(APIView):
-    throttle_classes = [AnonRateThrottle, UserRateThrottle]
-    @permission_classes([IsAuthenticated])
+def orders_for(user):
+    """
+    Orders `user` may see, with crew and line items loaded in two queries.
+
+    Managers see every order, delivery crew the orders assigned to them and
+    customers their own.
+    """
+    orders = Order.objects.select_related('delivery_crew_user').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('menuitem__category').order_by('id'))
+    )
+    roles = get_roles(user)
+    if MANAGER in roles:
+        return orders
+    if DELIVERY_CREW in roles:
+        return orders.filter(delivery_crew_user=user)
+    return orders.filter(user=user)
+
+
+class OrdersView(ReadReplicaMixin, generics.ListAPIView):
+    """Orders with their line items, newest first; ?status=0|1 filters."""
+    serializer_class = OrderDetailSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = OrderKeysetPagination
+
+    def get_queryset(self):
+        orders = orders_for(self.request.user).order_by('-date', '-id')
+        order_status = self.request.query_params.get('status')
+        if order_status in ('0', '1'):
+            orders = orders.filter(status=order_status == '1')
+        elif order_status is not None:
+            raise ValidationError({'status': ['Status must be either 0 or 1.']})
+        return orders
+
+
+class SingleOrderView(ReadReplicaMixin, generics.RetrieveAPIView):
+    serializer_class = OrderDetailSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return orders_for(self.request.user)
+
+
+class OrderDetailView(ReadReplicaMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
     def get(self, reqeust, orderId):
         try:
             order_item = OrderItem.objects.get(id=orderId)
@@ -231,52 +485,43 @@ class OrderDetailView(APIView):
         except OrderItem.DoesNotExist:
             raise NotFound("Order not found")
         
-        if self.request.user.groups.filter(name='Manager').exists():
+        if has_role(self.request.user, MANAGER):
             order.delete()
             return Response({'message': 'All order items deleted successfully.'}, status=status.HTTP_204_NO_CONTENT)
         else:
             raise PermissionDenied("Request denied, only Manager users allowed")
         
+    @method_decorator(idempotent)
     def post(self, request, orderId):
         # Check if the user is a manager
-        if not request.user.groups.filter(name='Manager').exists():
+        if not has_role(request.user, MANAGER):
             raise PermissionDenied("Only managers can create orders")
 
-        # Logic to assign a delivery crew user (you may need to customize this logic)
-        delivery_crew_user = User.objects.filter(groups__name='delivery-crew').first()
-        if delivery_crew_user is None:
-            return Response({"message": "No delivery crew available"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Retrieve order items as a queryset
-        order_items_queryset = OrderItem.objects.filter(id=orderId)
+        try:
+            order_item = OrderItem.objects.get(id=orderId)
+        except OrderItem.DoesNotExist:
+            return Response({"message": "OrderItem not found"}, status=status.HTTP_404_NOT_FOUND)
+        if order_item.header_id is not None:
+            return Response({"message": f"OrderItem already belongs to order {order_item.header_id}"},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        # Calculate the total price of the order based on the prices of the order items
-        total_price = sum(order_item.price for order_item in order_items_queryset)
-        
-        # Retrieve the user associated with the order
-        user = order_items_queryset.first().order  # Assuming all order items belong to the same user
-
-        # Calculate delivery date (today plus one week)
-        delivery_date = datetime.now() + timedelta(weeks=1)
-
-        # Extract only the date part from the delivery_date
-        delivery_date_date = delivery_date.date()
-
-        # Prepare the data for creating the order
-        order_data = {
-            'user': user.id,
-            'delivery_crew_user': delivery_crew_user.id,
-            'status': request.data.get('status'),
-            'total': total_price,
-            'date': delivery_date_date,
-        }
+        # Reject a bad status now rather than in a job that can only fail
+        status_serializer = DeliveryOrderSerializer(data={'status': request.data.get('status')}, partial=True)
+        if not status_serializer.is_valid():
+            return Response(status_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        # Serialize the order data
-        serializer = DeliveryOrderSerializer(data=order_data)
-        if serializer.is_valid():
-            order_instance = serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # Crew assignment, totals and the Order itself are written by the
+        # finalize_order job (tasks.py); the client polls the status URL
+        try:
+            job = jobs.enqueue('finalize_order',
+                               {'order_item_id': order_item.pk, 'status': status_serializer.validated_data['status']},
+                               user=request.user)
+        except jobs.QueueFull:
+            return Response({"message": "Too many orders are being processed, try again shortly"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '5'})
+        status_url = request.build_absolute_uri(reverse('job-detail', args=[job.pk]))
+        return Response({'job': job.pk, 'status': job.status, 'status_url': status_url},
+                        status=status.HTTP_202_ACCEPTED, headers={'Location': status_url})
 
     def patch(self, request, orderId):
         # Retrieve the order item
@@ -286,7 +531,7 @@ class OrderDetailView(APIView):
             return Response({"message": "OrderItem not found"}, status=status.HTTP_404_NOT_FOUND)
         
         # Check if the user is part of the delivery crew
-        if request.user.groups.filter(name='delivery-crew').exists():
+        if has_role(request.user, DELIVERY_CREW):
             # Extract the status from the request data
             status_value = int(request.data.get('status'))
             if status_value in [0, 1]:  # Ensure status is either 0 or 1
@@ -299,3 +544,75 @@ class OrderDetailView(APIView):
         else:
             return Response({"message": "Only delivery crew users are allowed to update order status."}, status=status.HTTP_403_FORBIDDEN)
  
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsManager])
+def dispatch_pending_orders(request):
+    """Assign every open order that has no delivery crew member yet."""
+    with transaction.atomic():
+        pending = list(Order.objects.filter(delivery_crew_user__isnull=True, status=False).order_by('date', 'id'))
+        assigned = dispatcher.assign_batch(pending)
+        Order.objects.bulk_update(assigned, ['delivery_crew_user'])
+    serializer = DeliveryOrderSerializer(assigned, many=True)
+    return Response({'assigned': serializer.data, 'unassigned': len(pending) - len(assigned)})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsManager])
+def sales_analytics(request):
+    """
+    Sales dashboard read from the pre-aggregated summary tables.
+
+    ?days= limits the daily revenue series (default 30) and ?top= the
+    number of best-selling menu items (default 10). Amounts are decimal
+    strings, like the rest of the API.
+    """
+    try:
+        days = int(request.query_params.get('days', 30))
+        top = int(request.query_params.get('top', 10))
+    except ValueError:
+        return Response({'message': 'days and top must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+    daily = DailySales.objects.order_by('-date')[:days]
+    menu_items = MenuItemSales.objects.select_related('menuitem').order_by('-units', 'menuitem_id')[:top]
+    categories = CategorySales.objects.select_related('category').order_by('-revenue_cents')
+
+    return Response({
+        'revenue_by_day': [
+            {'date': row.date, 'orders': row.orders, 'revenue': str(analytics.from_cents(row.revenue_cents))}
+            for row in reversed(daily)
+        ],
+        'top_menu_items': [
+            {'menuitem_id': row.menuitem_id, 'title': row.menuitem.title, 'units': row.units,
+             'revenue': str(analytics.from_cents(row.revenue_cents))}
+            for row in menu_items
+        ],
+        'categories': [
+            {'category_id': row.category_id, 'title': row.category.title, 'units': row.units,
+             'revenue': str(analytics.from_cents(row.revenue_cents))}
+            for row in categories
+        ],
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsManager])
+def metrics(request):
+    """Per-endpoint request metrics and cache statistics of this process in Prometheus text format."""
+    caches = {'catalog': catalog_cache.stats(), 'token': token_cache.stats()}
+    return HttpResponse(registry.render_prometheus() + render_cache_stats(caches),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_detail(request, pk):
+    """Progress of a background job; visible to whoever queued it and to managers."""
+    try:
+        job = Job.objects.get(pk=pk)
+    except Job.DoesNotExist:
+        raise NotFound("Job not found")
+    if job.created_by_id != request.user.pk and not has_role(request.user, MANAGER):
+        raise NotFound("Job not found")
+    return Response(JobSerializer(job).data)